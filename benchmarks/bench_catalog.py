@@ -0,0 +1,98 @@
+# benchmarks/bench_catalog.py
+"""
+How the compiled degree catalog scales with the number of majors.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_catalog
+    python -m benchmarks.bench_catalog --majors 10 100 1000 --lookups 100000
+
+Each size writes synthetic majors ("Major 17": 8 terms of 5 courses drawn
+from a shared pool of "SYN 1000"-style codes with random prerequisites on
+lower-numbered codes, the same in every major so the catalog stays acyclic) to a
+scratch directory, compiles them, and reports the binary size, compile and
+open time, the process RSS after opening, and the cost of a plan lookup
+through catalog.Catalog (uncached) and through an lru_cache like the one
+validation.generate_plan_from_major uses. The cached column looks up at most
+PLAN_CACHE_SIZE distinct majors after one warm-up pass, so it times hits
+only; "hit %" confirms that.
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+from functools import lru_cache
+
+import catalog
+from validation import PLAN_CACHE_SIZE
+
+
+def write_majors(directory: str, n: int, seed: int = 0):
+    rng = random.Random(seed)
+    pool = [f"SYN {1000 + i}" for i in range(max(200, n * 10))]
+    pool_prereqs = {c: [p for p in pool[max(0, i - 20):i] if rng.random() < 0.08] for i, c in enumerate(pool)}
+    for m in range(n):
+        courses = [pool[i] for i in sorted(rng.sample(range(len(pool)), 40))]
+        plan = {str(year): {"Fall": courses[(year - 1) * 10:(year - 1) * 10 + 5],
+                            "Spring": courses[(year - 1) * 10 + 5:year * 10]} for year in range(1, 5)}
+        prereqs = {c: pool_prereqs[c] for c in courses}
+        with open(os.path.join(directory, f"major_{m}.json"), "w") as f:
+            json.dump({"major": f"Major {m}", "aliases": [f"M{m}"], "plan": plan, "prerequisites": prereqs}, f)
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--majors", type=int, nargs="+", default=[4, 40, 400, 2000])
+    parser.add_argument("--lookups", type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f"{'majors':>7} {'file KB':>8} {'compile ms':>11} {'open ms':>8} {'peak RSS MB':>12} "
+          f"{'plan us':>8} {'cached us':>10} {'hit %':>6}")
+    for n in args.majors:
+        with tempfile.TemporaryDirectory() as directory:
+            write_majors(directory, n)
+            path = os.path.join(directory, "catalog.bin")
+            t0 = time.perf_counter()
+            catalog.compile_catalog(directory, path)
+            compile_ms = (time.perf_counter() - t0) * 1000
+
+            t0 = time.perf_counter()
+            cat = catalog.Catalog(path)
+            open_ms = (time.perf_counter() - t0) * 1000
+
+            rng = random.Random(1)
+            names = [f"Major {rng.randrange(n)}" for _ in range(args.lookups)]
+            t0 = time.perf_counter()
+            for name in names:
+                cat.plan(cat.find_major(name))
+            plan_us = (time.perf_counter() - t0) / len(names) * 1e6
+
+            # Cycling through more majors than the cache holds would time misses, not the cache
+            hot = [f"Major {rng.randrange(min(n, PLAN_CACHE_SIZE))}" for _ in range(args.lookups)]
+            cached = lru_cache(maxsize=PLAN_CACHE_SIZE)(lambda name: cat.plan(cat.find_major(name)))
+            for name in set(hot):
+                cached(name)
+            warm = cached.cache_info()
+            t0 = time.perf_counter()
+            for name in hot:
+                cached(name)
+            cached_us = (time.perf_counter() - t0) / len(hot) * 1e6
+            info = cached.cache_info()
+            hit_pct = (info.hits - warm.hits) / len(hot) * 100
+
+            print(f"{n:>7} {os.path.getsize(path) / 1024:>8.1f} {compile_ms:>11.1f} {open_ms:>8.3f} "
+                  f"{peak_rss_mb():>12.1f} {plan_us:>8.2f} {cached_us:>10.2f} {hit_pct:>6.1f}")
+            cached.cache_clear()
+            cat.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/bench_cohort.py
+"""
+Cohort batch planning throughput (cohort.plan_cohort, the engine behind
+POST /api/schedule/build/batch), in students per second and per core.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_cohort
+    python -m benchmarks.bench_cohort --students 5000 --workers 1 2 4 --duplicates 0.3
+
+Students are drawn from the real catalog: a random major's degree plan, the
+first few terms completed and the rest planned with random day/time prefs.
+--duplicates is the share of students that copy an earlier student's profile
+(course order shuffled), as happens when a cohort follows the same plan.
+"workers 0" plans in-process on one executor thread, without the pool; any
+other count forces the pool, whatever COHORT_POOL_MIN says, so the two can
+be compared to pick that threshold. Pools are warmed up before timing, so
+spawn and import costs are not counted.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+import cohort
+import validation
+import workers
+
+DAY_CHOICES = [[], ["Monday", "Wednesday"], ["Tuesday", "Thursday"], ["Friday"]]
+TIME_CHOICES = ["Any", "Morning", "Afternoon", "Evening"]
+
+
+def make_cohort(n: int, duplicates: float, seed: int = 0):
+    rng = random.Random(seed)
+    plans = {}
+    for major in validation.CATALOG.majors():
+        codes = []
+        for term in validation.generate_plan_from_major(major, 2025):
+            codes += [f"{d} {num}" for entry in term["courses"]
+                      for d, num in validation.COURSE_CODE_RE.findall(entry)]
+        plans[major] = list(dict.fromkeys(codes))
+    students = []
+    for i in range(n):
+        if students and rng.random() < duplicates:
+            courses = list(rng.choice(students)["courses"])
+            rng.shuffle(courses)
+        else:
+            codes = plans[rng.choice(list(plans))]
+            done = rng.randrange(len(codes) // 2)
+            courses = [{"code": c, "title": c, "credits": 3, "term": "Fall 2025",
+                        "status": "completed" if j < done else "planned",
+                        "prefs": {"days": rng.choice(DAY_CHOICES), "timeOfDay": rng.choice(TIME_CHOICES),
+                                  "modality": "Any"}}
+                       for j, c in enumerate(codes)]
+        students.append({"studentId": f"s{i}", "courses": courses, "maxCreditsPerTerm": 15,
+                         "includeSummer": False, "startTerm": "Fall 2025"})
+    return students
+
+
+async def run(students, chunk: int, pool_min: int) -> dict:
+    summary = None
+    async for event in cohort.plan_cohort(students, chunk, pool_min):
+        if event["type"] == "summary":
+            summary = event
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, os.cpu_count() or 1])
+    parser.add_argument("--duplicates", type=float, default=0.0)
+    parser.add_argument("--chunk", type=int, default=cohort.BATCH_CHUNK)
+    args = parser.parse_args()
+
+    students = make_cohort(args.students, args.duplicates)
+    print(f"{'workers':>8} {'students':>9} {'unique':>7} {'seconds':>8} {'students/s':>11} {'per core':>9}")
+    for n in dict.fromkeys(args.workers):
+        workers.shutdown_pool()
+        if n:
+            os.environ["WORKER_PROCESSES"] = str(n)
+            asyncio.run(run(students[:args.chunk * n * 2], args.chunk, 0))  # spawn and warm every worker
+        t0 = time.perf_counter()
+        summary = asyncio.run(run(students, args.chunk, 0 if n else len(students) + 1))
+        seconds = time.perf_counter() - t0
+        rate = summary["students"] / seconds
+        print(f"{n:>8} {summary['students']:>9} {summary['unique_profiles']:>7} {seconds:>8.2f} "
+              f"{rate:>11.0f} {rate / max(n, 1):>9.0f}")
+    workers.shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
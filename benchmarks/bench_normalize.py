@@ -0,0 +1,72 @@
+# benchmarks/bench_normalize.py
+"""
+Throughput of normalize.normalize_student_input in documents per second.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_normalize
+    python -m benchmarks.bench_normalize --docs 2000 --courses 40
+
+Documents are synthetic transcripts (term headings followed by course lines)
+mixed with short free-text chat messages. The same corpus is timed in one
+process and split across the shared worker pool the batch endpoint uses.
+"""
+
+import argparse
+import random
+import time
+
+import workers
+from normalize import normalize_many
+
+DEPTS = ["COSC", "MATH", "ENGL", "PHYS", "GOVT", "HIST"]
+GRADES = ["A", "A-", "B+", "B", "C", "W", "F", ""]
+
+
+def make_transcript(rng: random.Random, n_courses: int) -> str:
+    lines = ["UNIVERSITY OF HOUSTON  UNOFFICIAL TRANSCRIPT", "Major: Computer Science",
+             f"Expected Graduation: May {rng.randint(2026, 2030)}"]
+    year = 2020
+    for i in range(n_courses):
+        if i % 5 == 0:
+            season = "Fall" if i % 10 == 0 else "Spring"
+            year += season == "Fall"
+            lines.append(f"{season} {year}")
+        lines.append(f"{rng.choice(DEPTS)} {rng.randint(1000, 4999)}   Course Title {i}   "
+                     f"{rng.choice(['3.00', '4.00', '1.00'])}   {rng.choice(GRADES)}".rstrip())
+    return "\n".join(lines)
+
+
+def make_message(rng: random.Random) -> str:
+    return (f"I'm majoring in computer science. I took COSC 1336 and {rng.choice(DEPTS)} {rng.randint(1000, 4999)}. "
+            f"I want to take COSC 3360 and would like summer classes. I plan to graduate in Fall 2028.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=1000)
+    parser.add_argument("--courses", type=int, default=40, help="course lines per transcript")
+    parser.add_argument("--chunk", type=int, default=64)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    docs = [make_transcript(rng, args.courses) if i % 2 else make_message(rng) for i in range(args.docs)]
+    size_mb = sum(len(d) for d in docs) / 1e6
+
+    t0 = time.perf_counter()
+    normalize_many(docs)
+    single = time.perf_counter() - t0
+    print(f"single process: {args.docs / single:10.0f} docs/s  ({size_mb / single:.1f} MB/s)")
+
+    pool = workers.get_pool()
+    chunks = [docs[i:i + args.chunk] for i in range(0, len(docs), args.chunk)]
+    list(pool.map(normalize_many, chunks[:workers.pool_size()]))  # warm up the workers
+    t0 = time.perf_counter()
+    list(pool.map(normalize_many, chunks))
+    pooled = time.perf_counter() - t0
+    print(f"{workers.pool_size():>2} workers:     {args.docs / pooled:10.0f} docs/s  ({size_mb / pooled:.1f} MB/s)")
+    workers.shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
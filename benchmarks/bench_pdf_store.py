@@ -0,0 +1,79 @@
+# benchmarks/bench_pdf_store.py
+"""
+pdf_text.PDFTextStore as uploads accumulate.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_pdf_store
+    python -m benchmarks.bench_pdf_store --docs 10 100 1000 --pages 20
+
+Each size stores synthetic transcripts and catalogs (pages of "COSC 1437
+Title A 3.0"-style lines under term headers) in a scratch directory, then
+asks for the excerpts a build request referencing 3 of them would put in its
+prompt. Reported: raw text vs compressed bytes on disk, decompressed text held
+in the page cache (what the old in-memory dict held is the raw column), add
+cost per document, and excerpt lookup time and size per request.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import pdf_text
+
+DEPTS = ["COSC", "MATH", "PHYS", "ENGL", "HIST", "BIOL", "CHEM", "ECON"]
+SEASONS = ["Spring", "Summer", "Fall"]
+
+
+def make_pages(rng: random.Random, pages: int, lines: int = 40):
+    out = []
+    for p in range(pages):
+        rows = [f"{rng.choice(SEASONS)} {rng.randrange(2018, 2027)}"]
+        for _ in range(lines):
+            rows.append(f"{rng.choice(DEPTS)} {rng.randrange(1000, 5000)} "
+                        f"{'Course title words ' * rng.randrange(1, 4)}{rng.choice('ABCDF')} {rng.choice([3, 4])}.0")
+        out.append("\n".join(rows) + "\n")
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'docs':>6} {'raw MB':>7} {'disk MB':>8} {'cache MB':>9} {'add ms':>7} "
+          f"{'excerpt ms':>11} {'excerpt chars':>14}")
+    for n in args.docs:
+        rng = random.Random(n)
+        with tempfile.TemporaryDirectory() as directory:
+            store = pdf_text.PDFTextStore(os.path.join(directory, "pdf_text"))
+            raw, add_ms = 0, []
+            for i in range(n):
+                pages = make_pages(rng, args.pages)
+                raw += sum(len(p) for p in pages)
+                t0 = time.perf_counter()
+                store.add(f"doc-{i}", f"doc-{i}.pdf", f"sha-{i}", pages)
+                add_ms.append((time.perf_counter() - t0) * 1000)
+
+            lookup_ms, chars = [], []
+            for _ in range(args.requests):
+                ids = [f"doc-{rng.randrange(n)}" for _ in range(3)]
+                codes = [f"{rng.choice(DEPTS)} {rng.randrange(1000, 5000)}" for _ in range(12)]
+                t0 = time.perf_counter()
+                excerpts = store.snippets(ids, codes)
+                lookup_ms.append((time.perf_counter() - t0) * 1000)
+                chars.append(sum(len(e["text"]) for e in excerpts))
+
+            stats = store.stats()
+            print(f"{n:>6} {raw / 1e6:>7.2f} {stats['disk_bytes'] / 1e6:>8.2f} "
+                  f"{stats['cached_chars'] / 1e6:>9.2f} {statistics.median(add_ms):>7.2f} "
+                  f"{statistics.median(lookup_ms):>11.3f} {max(chars):>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/bench_replan.py
+"""
+Cost of a single-course edit: replan.replan (incremental) vs solver.solve (full rebuild).
+
+Run from the repo root:
+
+    python -m benchmarks.bench_replan
+    python -m benchmarks.bench_replan --sizes 50 200 500 --edits 200
+
+Each edit is a random credits/term change, delete or create on a synthetic
+plan (see benchmarks.bench_solver.make_courses), applied one after another.
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+import replan
+import solver
+from benchmarks.bench_solver import make_courses
+
+
+def random_edit(rng: random.Random, courses: list, i: int):
+    kind = rng.choice(["credits", "term", "delete", "create"])
+    target = rng.choice(courses)
+    if kind == "credits":
+        return [], [(target["id"], {"credits": rng.choice([1, 3, 4])})], []
+    if kind == "term":
+        return [], [(target["id"], {"term": rng.choice(["Fall 2025", "Spring 2026", "Fall 2026"])})], []
+    if kind == "delete":
+        return [], [], [target["id"]]
+    return [{"id": f"new-{i}", "code": f"NEW {1000 + i}", "title": "New", "credits": 3, "term": "Fall 2025"}], [], []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[25, 50, 100, 250, 500])
+    parser.add_argument("--edits", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'courses':>8} {'full ms':>8} {'incr ms':>8} {'ratio':>6} {'affected':>9} {'full rebuilds':>14}")
+    for n in args.sizes:
+        courses, prereqs = make_courses(n)
+        for i, c in enumerate(courses):
+            c["id"] = str(i)
+        prereq_fn = lambda c: prereqs.get(c, [])  # noqa: E731
+        rules = {"max_credits": solver.DEFAULT_MAX_CREDITS, "include_summer": False, "start_term": "Fall 2025"}
+        state = replan.PlanState.from_result(courses, solver.solve(courses, prereq_fn=prereq_fn, **rules), **rules)
+
+        rng = random.Random(n)
+        full, incremental, affected, rebuilds = [], [], [], 0
+        for i in range(args.edits):
+            new_courses = replan.apply_changes(state.courses, *random_edit(rng, state.courses, i))
+            t0 = time.perf_counter()
+            solver.solve(new_courses, prereq_fn=prereq_fn, **rules)
+            full.append((time.perf_counter() - t0) * 1000)
+            t0 = time.perf_counter()
+            state, stats = replan.replan(state, new_courses, prereq_fn)
+            incremental.append((time.perf_counter() - t0) * 1000)
+            affected.append(stats["affected"])
+            rebuilds += stats["mode"] == "full"
+
+        f, inc = statistics.median(full), statistics.median(incremental)
+        print(f"{n:>8} {f:>8.2f} {inc:>8.3f} {inc / f:>6.1%} {statistics.mean(affected):>9.1f} {rebuilds:>14}")
+
+
+if __name__ == "__main__":
+    main()
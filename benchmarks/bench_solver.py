@@ -0,0 +1,63 @@
+# benchmarks/bench_solver.py
+"""
+How solver.solve scales with the number of planned courses.
+
+Run from the repo root:
+
+    python -m benchmarks.bench_solver
+    python -m benchmarks.bench_solver --sizes 10 50 100 500 --repeat 5
+
+Courses are synthetic ("SYN 1000", "SYN 1001", ...) with 0-2 prerequisites
+drawn from earlier courses, so the prerequisite graph is a random DAG, and a
+mix of narrow and open day/time preferences.
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+import solver
+
+DAY_CHOICES = [[], ["Mon", "Wed"], ["Tue", "Thu"], ["Mon", "Wed", "Fri"], ["Fri"]]
+TIME_CHOICES = ["Any", "Morning", "Afternoon", "Evening"]
+
+
+def make_courses(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    courses, prereqs = [], {}
+    for i in range(n):
+        code = f"SYN {1000 + i}"
+        earlier = [f"SYN {1000 + j}" for j in range(max(0, i - 20), i)]
+        prereqs[code] = rng.sample(earlier, k=min(len(earlier), rng.randint(0, 2)))
+        courses.append({
+            "code": code,
+            "title": f"Synthetic {i}",
+            "credits": rng.choice([3, 3, 3, 4, 1]),
+            "term": "Fall 2025",
+            "status": "completed" if rng.random() < 0.1 else "planned",
+            "prefs": {"days": rng.choice(DAY_CHOICES), "timeOfDay": rng.choice(TIME_CHOICES), "modality": "Any"},
+        })
+    return courses, prereqs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 25, 50, 100, 250, 500])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'courses':>8} {'terms':>6} {'nodes':>8} {'median ms':>10} {'max ms':>8}")
+    for n in args.sizes:
+        courses, prereqs = make_courses(n)
+        timings, result = [], None
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            result = solver.solve(courses, start_term="Fall 2025", prereq_fn=lambda c: prereqs.get(c, []))
+            timings.append((time.perf_counter() - t0) * 1000)
+        print(f"{n:>8} {len(result['terms']):>6} {result['stats']['nodes']:>8} "
+              f"{statistics.median(timings):>10.2f} {max(timings):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
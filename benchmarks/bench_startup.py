@@ -0,0 +1,131 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start benchmark for the API.
+
+Two measurements, each in fresh interpreters:
+
+- import: `python -X importtime -c "import main"`; total time to import main
+  plus the slowest modules it pulls in.
+- first 200: launch uvicorn and poll until GET / returns 200. Runs once per
+  STARTUP_MODE (warm, lazy, eager) so the deferred openai import shows up.
+
+With --budget-ms (and/or --import-budget-ms) the script exits non-zero when
+the median exceeds the budget, so any job or script can hold the app to a
+cold-start budget. Run from the repo root (needs uvicorn and httpx):
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 5 --budget-ms 1500 --import-budget-ms 700
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+from benchmarks.load_test import REPO_ROOT, free_port
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def scratch_env(workdir: str, mode: str) -> Dict[str, str]:
+    return {
+        **os.environ,
+        "STARTUP_MODE": mode,
+        "COURSE_DB_PATH": os.path.join(workdir, "courses.sqlite3"),
+        "LLM_CACHE_PATH": "",
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "mock"),
+    }
+
+
+def import_profile(workdir: str, mode: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """(ms to import main, [(module, cumulative ms)] for main's direct imports)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import sys; sys.path.insert(0, {REPO_ROOT!r}); import main"],
+        cwd=workdir, env=scratch_env(workdir, mode), capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import main failed:\n{proc.stderr[-2000:]}")
+    total, children = 0.0, []
+    for line in proc.stderr.splitlines():
+        m = IMPORTTIME_RE.match(line)
+        if not m:
+            continue
+        cumulative_ms, depth, name = int(m.group(2)) / 1000, len(m.group(3)), m.group(4)
+        # Lines are printed when an import finishes, so a module's children come right before it
+        if depth == 0:
+            if name == "main":
+                total = cumulative_ms
+                break
+            children = []
+        elif depth == 2:
+            children.append((name, cumulative_ms))
+    return total, sorted(children, key=lambda c: -c[1])
+
+
+def first_200(workdir: str, mode: str, path: str = "/") -> float:
+    """ms from launching uvicorn until `path` first answers 200."""
+    port = free_port()
+    started = time.perf_counter()
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", REPO_ROOT, "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=workdir, env=scratch_env(workdir, mode),
+    )
+    try:
+        while True:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}{path}", timeout=1).status_code == 200:
+                    return (time.perf_counter() - started) * 1000
+            except httpx.HTTPError:
+                pass
+            if app.poll() is not None or time.perf_counter() - started > 60:
+                raise SystemExit(f"App failed to start (STARTUP_MODE={mode}).")
+            time.sleep(0.01)
+    finally:
+        app.terminate()
+        app.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="fresh processes per measurement")
+    parser.add_argument("--modes", nargs="+", default=["warm", "lazy", "eager"])
+    parser.add_argument("--path", default="/", help="route polled for the first 200")
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to list")
+    parser.add_argument("--budget-ms", type=float, help="fail if median time-to-first-200 (first mode) exceeds this")
+    parser.add_argument("--import-budget-ms", type=float, help="fail if median import time of main exceeds this")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="course-planner-startup-")
+    failures = []
+
+    imports = [import_profile(workdir, args.modes[0]) for _ in range(args.runs)]
+    import_ms = statistics.median(t for t, _ in imports)
+    print(f"import main: median {import_ms:.0f} ms over {args.runs} run(s)")
+    for name, ms in imports[-1][1][:args.top]:
+        print(f"  {name:<28} {ms:8.1f} ms")
+    if args.import_budget_ms is not None and import_ms > args.import_budget_ms:
+        failures.append(f"import main {import_ms:.0f} ms > budget {args.import_budget_ms:.0f} ms")
+
+    print(f"\n{'STARTUP_MODE':<14} {'median ms':>10} {'min ms':>8} {'max ms':>8}   (time to first 200 on {args.path})")
+    for i, mode in enumerate(args.modes):
+        samples = [first_200(workdir, mode, args.path) for _ in range(args.runs)]
+        median = statistics.median(samples)
+        print(f"{mode:<14} {median:>10.0f} {min(samples):>8.0f} {max(samples):>8.0f}")
+        if i == 0 and args.budget_ms is not None and median > args.budget_ms:
+            failures.append(f"first 200 ({mode}) {median:.0f} ms > budget {args.budget_ms:.0f} ms")
+
+    if failures:
+        print("\nOVER BUDGET: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
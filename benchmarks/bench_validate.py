@@ -0,0 +1,67 @@
+# benchmarks/bench_validate.py
+"""
+Schedules per second for schedule_validation (validate only, and validate + repair).
+
+Run from the repo root:
+
+    python -m benchmarks.bench_validate
+    python -m benchmarks.bench_validate --schedules 5000 --courses 10 40
+
+Each schedule is the solver's answer for a synthetic request (see
+benchmarks.bench_solver.make_courses), damaged the way LLM answers tend to
+be: a few courses pulled a term earlier, one dropped, one duplicated.
+"""
+
+import argparse
+import random
+import time
+
+import schedule_validation
+import solver
+from benchmarks.bench_solver import make_courses
+
+
+def damaged_schedules(n_courses: int, count: int, seed: int = 0):
+    courses, prereqs = make_courses(n_courses, seed)
+    prereq_fn = lambda c: prereqs.get(c, [])  # noqa: E731
+    result = solver.solve(courses, start_term="Fall 2025", prereq_fn=prereq_fn)
+    rng = random.Random(seed)
+    schedules = []
+    for _ in range(count):
+        entries = [{"code": e["code"], "suggested_term": e["suggested_term"]} for e in result["planned_schedule"]]
+        for e in rng.sample(entries, k=min(3, len(entries))):
+            t = solver.term_index(e["suggested_term"])
+            e["suggested_term"] = solver.term_name(max(t - 2, solver.term_index("Fall 2025")))
+        if entries:
+            entries.pop(rng.randrange(len(entries)))
+            entries.append(dict(rng.choice(entries)))
+        schedules.append(entries)
+    return courses, prereq_fn, schedules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schedules", type=int, default=2000)
+    parser.add_argument("--courses", type=int, nargs="+", default=[10, 25, 50, 100])
+    args = parser.parse_args()
+
+    print(f"{'courses':>8} {'violations':>11} {'validate/s':>11} {'repair/s':>9} {'left after':>11}")
+    for n in args.courses:
+        courses, prereq_fn, schedules = damaged_schedules(n, args.schedules)
+        rules = {"start_term": "Fall 2025", "prereq_fn": prereq_fn}
+
+        t0 = time.perf_counter()
+        reports = [schedule_validation.validate_schedule(s, courses, **rules) for s in schedules]
+        validate_rate = len(schedules) / (time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        repaired = [schedule_validation.repair_schedule(s, courses, **rules) for s in schedules]
+        repair_rate = len(schedules) / (time.perf_counter() - t0)
+
+        found = sum(len(r["violations"]) for r in reports) / len(reports)
+        left = sum(len(r["violations"]) for r in repaired) / len(repaired)
+        print(f"{n:>8} {found:>11.1f} {validate_rate:>11.0f} {repair_rate:>9.0f} {left:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
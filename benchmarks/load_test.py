@@ -0,0 +1,324 @@
+# benchmarks/load_test.py
+"""
+Offline load test for every /api route.
+
+Starts benchmarks.mock_openai in-process and the FastAPI app (main:app)
+under uvicorn in a subprocess. The app runs in a scratch directory, with the
+OpenAI client pointed at the mock and its own SQLite files and uploads.
+Each route is then driven at a fixed concurrency. Reports p50/p95/p99
+latency, throughput and errors per route plus the app's peak RSS, and saves
+everything as JSON so two commits can be compared.
+
+Run from the repo root (needs uvicorn, httpx and PyMuPDF):
+
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --requests 500 --concurrency 32 --llm-latency-ms 1500
+    python -m benchmarks.load_test --output new.json --compare old.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+from benchmarks import mock_openai
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+
+# ------------ Helpers -------------------------------------------------
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def rss_mb(pid: int) -> Dict[str, float]:
+    """Current and peak RSS of a process from /proc (Linux only)."""
+    out = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    key, value = line.split(":")
+                    out["rss_mb" if key == "VmRSS" else "peak_rss_mb"] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return out
+
+
+def child_pids(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def make_pdf(pages: int, salt: int) -> bytes:
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page()
+        y = 72
+        page.insert_text((72, y), f"UNOFFICIAL TRANSCRIPT #{salt}  page {p + 1}")
+        for i in range(30):
+            y += 20
+            page.insert_text((72, y), f"COSC {1000 + (i * 7 + p) % 4000}   Course Title {i}   3.00   A")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def make_courses(rng: random.Random, n: int) -> List[dict]:
+    days = [[], ["Mon", "Wed"], ["Tue", "Thu"]]
+    return [{
+        "id": str(i),
+        "code": f"COSC {rng.randint(1000, 4999)}",
+        "title": "Benchmark course",
+        "credits": 3,
+        "term": "Fall 2026",
+        "status": "completed" if rng.random() < 0.3 else "planned",
+        "prefs": {"days": rng.choice(days), "timeOfDay": rng.choice(["Any", "Morning", "Afternoon"]),
+                  "modality": "Any"},
+    } for i in range(n)]
+
+
+# ------------ Driver --------------------------------------------------
+
+async def drive(name: str, n: int, concurrency: int, call: Callable[[int], Awaitable[httpx.Response]],
+                ok: Callable[[httpx.Response], bool] = lambda r: r.status_code < 400) -> dict:
+    latencies, errors = [], 0
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                r = await call(i)
+                good = ok(r)
+            except httpx.HTTPError:
+                good = False
+            latencies.append((time.perf_counter() - t0) * 1000)
+            errors += not good
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    wall = time.perf_counter() - started
+    result = {
+        "requests": n,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        "throughput_rps": round(n / wall, 1) if wall else 0.0,
+    }
+    print(f"{name:<32} {n:>6} {errors:>6} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+          f"{result['p99_ms']:>9.1f} {result['throughput_rps']:>9.1f}")
+    return result
+
+
+async def run_scenarios(base_url: str, args) -> Dict[str, dict]:
+    rng = random.Random(args.seed)
+    n, conc = args.requests, args.concurrency
+    results: Dict[str, dict] = {}
+    limits = httpx.Limits(max_connections=conc * 2, max_keepalive_connections=conc * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as c:
+        course = {"code": "COSC 2436", "title": "Data Structures", "credits": 3, "term": "Fall 2026"}
+
+        created: List[str] = []
+
+        async def create(i):
+            r = await c.post("/api/courses", json={**course, "code": f"COSC {1000 + i % 4000}"})
+            if r.status_code == 201:
+                created.append(r.json()["id"])
+            return r
+
+        results["POST /api/courses"] = await drive("POST /api/courses", n, conc, create)
+        results["GET /api/courses"] = await drive(
+            "GET /api/courses", n, conc, lambda i: c.get("/api/courses", params={"limit": 100}))
+        results["GET /api/courses?status"] = await drive(
+            "GET /api/courses?status", n, conc, lambda i: c.get("/api/courses", params={"status": "planned"}))
+        results["PUT /api/courses/{id}"] = await drive(
+            "PUT /api/courses/{id}", len(created), conc,
+            lambda i: c.put(f"/api/courses/{created[i]}", json={"status": "completed"}))
+        results["POST /api/courses/bulk"] = await drive(
+            "POST /api/courses/bulk", max(1, n // 10), conc,
+            lambda i: c.post("/api/courses/bulk", json={"create": [course] * 300}))
+        results["DELETE /api/courses/{id}"] = await drive(
+            "DELETE /api/courses/{id}", len(created), conc, lambda i: c.delete(f"/api/courses/{created[i]}"))
+
+        messages = ["I'm majoring in computer science. I took COSC 1336 and COSC 1437. I want to take "
+                    "COSC 3360 and would like summer classes. I plan to graduate in Fall 2028."]
+        results["POST /api/nlp/preferences"] = await drive(
+            "POST /api/nlp/preferences", n, conc, lambda i: c.post("/api/nlp/preferences", json={"text": messages[0]}))
+        results["POST /api/nlp/preferences/batch"] = await drive(
+            "POST /api/nlp/preferences/batch", max(1, n // 10), conc,
+            lambda i: c.post("/api/nlp/preferences/batch", json={"documents": messages * 200}))
+
+        bodies = [{"courses": make_courses(rng, args.courses)} for _ in range(n)]
+        results["POST /api/schedule/build"] = await drive(
+            "POST /api/schedule/build", n, conc, lambda i: c.post("/api/schedule/build", json=bodies[i]))
+        results["POST /api/schedule/build (LLM)"] = await drive(
+            "POST /api/schedule/build (LLM)", n, conc,
+            lambda i: c.post("/api/schedule/build", json={**bodies[i], "useLLM": True}))
+
+        async def stream(i):
+            async with c.stream("POST", "/api/schedule/build/stream",
+                                json={"courses": make_courses(rng, args.courses), "useLLM": True}) as r:
+                async for _ in r.aiter_bytes():
+                    pass
+            return r
+
+        results["POST /api/schedule/build/stream"] = await drive(
+            "POST /api/schedule/build/stream", max(1, n // 4), conc, stream)
+
+        for pages in args.pdf_pages:
+            pdfs = [make_pdf(pages, salt=pages * 100000 + i) for i in range(args.pdf_uploads)]
+
+            async def upload(i, pdfs=pdfs, pages=pages):
+                r = await c.post("/api/uploads/pdf", files={"file": (f"bench-{pages}-{i}.pdf", pdfs[i], "application/pdf")})
+                if r.status_code >= 400:
+                    return r
+                job = r.json()
+                while job["status"] not in ("done", "error"):
+                    await asyncio.sleep(0.02)
+                    job = (await c.get(f"/api/uploads/jobs/{job['jobId']}")).json()
+                return httpx.Response(200 if job["status"] == "done" else 500, json=job)
+
+            name = f"PDF upload→done ({pages}p)"
+            results[name] = await drive(name, args.pdf_uploads, min(conc, args.pdf_uploads), upload)
+    return results
+
+
+def compare(old: dict, new: dict):
+    print(f"\n{'route':<32} {'p95 old':>9} {'p95 new':>9} {'Δ%':>7}   {'rps old':>9} {'rps new':>9}")
+    for route, cur in new["routes"].items():
+        prev = old.get("routes", {}).get(route)
+        if not prev:
+            continue
+        delta = (cur["p95_ms"] - prev["p95_ms"]) / prev["p95_ms"] * 100 if prev["p95_ms"] else 0.0
+        print(f"{route:<32} {prev['p95_ms']:>9.1f} {cur['p95_ms']:>9.1f} {delta:>+6.1f}%   "
+              f"{prev['throughput_rps']:>9.1f} {cur['throughput_rps']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--courses", type=int, default=30, help="courses per schedule request")
+    parser.add_argument("--pdf-pages", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--pdf-uploads", type=int, default=8, help="uploads per PDF size")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=150.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results JSON path (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to diff against")
+    args = parser.parse_args()
+
+    mock, mock_stats = mock_openai.serve(latency_ms=args.llm_latency_ms, jitter_ms=args.llm_jitter_ms,
+                                         error_rate=args.llm_error_rate)
+    port = free_port()
+    workdir = tempfile.mkdtemp(prefix="course-planner-bench-")
+    env = {
+        **os.environ,
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{mock.server_address[1]}/v1",
+        "OPENAI_API_KEY": "mock",
+        "COURSE_DB_PATH": os.path.join(workdir, "courses.sqlite3"),
+        "LLM_CACHE_PATH": "",  # memory tier only; every benchmark run starts cold
+    }
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", REPO_ROOT, "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"],
+        cwd=workdir, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        boot = time.perf_counter()
+        while True:
+            try:
+                if httpx.get(base_url + "/", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if app.poll() is not None or time.perf_counter() - boot > 60:
+                raise SystemExit("App failed to start.")
+            time.sleep(0.05)
+        startup_ms = (time.perf_counter() - boot) * 1000
+
+        print(f"{'route':<32} {'reqs':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+        routes = asyncio.run(run_scenarios(base_url, args))
+
+        memory = {"app": rss_mb(app.pid)}
+        for pid in child_pids(app.pid):
+            memory[f"child {pid}"] = rss_mb(pid)
+            for grandchild in child_pids(pid):
+                memory[f"child {grandchild}"] = rss_mb(grandchild)
+    finally:
+        app.terminate()
+        app.wait(timeout=30)
+        mock.shutdown()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "cpus": os.cpu_count(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "startup_ms": round(startup_ms, 1),
+        "routes": routes,
+        "memory": memory,
+        "mock_openai": mock_stats,
+    }
+    peak = sum(m.get("peak_rss_mb", 0) for m in memory.values())
+    print(f"\nstartup {startup_ms:.0f} ms, peak RSS {peak:.1f} MB across {len(memory)} process(es), "
+          f"mock LLM calls {mock_stats['requests']} ({mock_stats['errors']} failed)")
+
+    output = args.output
+    if not output:
+        os.makedirs(DEFAULT_RESULTS_DIR, exist_ok=True)
+        output = os.path.join(DEFAULT_RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{report['commit']}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# benchmarks/mock_openai.py
+"""
+Local stand-in for the OpenAI chat completions API.
+
+Serves POST /v1/chat/completions (plain and `stream: true`) with configurable
+latency and error rate, so the API can be benchmarked without network access
+or tokens. Point the app at it with:
+
+    OPENAI_BASE_URL=http://127.0.0.1:8911/v1 OPENAI_API_KEY=mock
+
+Run standalone from the repo root:
+
+    python -m benchmarks.mock_openai --port 8911 --latency-ms 800 --error-rate 0.02
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def mock_answer(messages: list) -> dict:
+    """Echo the solver draft from the prompt back as the 'LLM' schedule."""
+    planned = []
+    try:
+        payload = json.loads(messages[-1]["content"])
+        for term, rows in payload.get("draft", {}).items():
+            planned += [{"code": row[0], "suggested_term": term} for row in rows]
+    except (ValueError, KeyError, TypeError, IndexError):
+        pass
+    return {"planned_schedule": planned, "reasoning": "Mock response: kept the solver draft."}
+
+
+def make_handler(latency_ms: float, jitter_ms: float, error_rate: float, stats: dict):
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):  # keep benchmark output clean
+            pass
+
+        def _send_json(self, status: int, body: dict):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            with lock:
+                stats["requests"] += 1
+            delay = max(0.0, random.gauss(latency_ms, jitter_ms)) / 1000
+            if random.random() < error_rate:
+                time.sleep(delay / 4)
+                with lock:
+                    stats["errors"] += 1
+                self._send_json(500, {"error": {"message": "Mock upstream failure", "type": "server_error"}})
+                return
+
+            content = json.dumps(mock_answer(body.get("messages", [])))
+            prompt_tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4
+            base = {"id": "chatcmpl-mock", "created": int(time.time()), "model": body.get("model", "mock")}
+
+            if not body.get("stream"):
+                time.sleep(delay)
+                self._send_json(200, {
+                    **base,
+                    "object": "chat.completion",
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content) // 4,
+                              "total_tokens": prompt_tokens + len(content) // 4},
+                })
+                return
+
+            # Streaming: first chunk after a quarter of the latency, the rest spread out
+            pieces = [content[i:i + 16] for i in range(0, len(content), 16)] or [""]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            time.sleep(delay / 4)
+            for i, piece in enumerate(pieces):
+                chunk = {**base, "object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {"content": piece},
+                                      "finish_reason": "stop" if i == len(pieces) - 1 else None}]}
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+                time.sleep(delay * 0.75 / len(pieces))
+            self._write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _write_chunk(self, text: str):
+            data = text.encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+def serve(host: str = "127.0.0.1", port: int = 0, latency_ms: float = 500.0,
+          jitter_ms: float = 100.0, error_rate: float = 0.0):
+    """Start the mock server on a daemon thread. Returns (server, stats); port 0 picks a free one."""
+    stats = {"requests": 0, "errors": 0}
+    server = ThreadingHTTPServer((host, port), make_handler(latency_ms, jitter_ms, error_rate, stats))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8911)
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    parser.add_argument("--jitter-ms", type=float, default=100.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, _ = serve(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate)
+    print(f"Mock OpenAI listening on http://{args.host}:{server.server_address[1]}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+# catalog.py
+"""
+Degree-plan catalog for many majors, compiled to one memory-mapped file.
+
+Source data is one JSON file per major in CATALOG_DIR (catalogs/*.json):
+
+    {"major": "Computer Science", "aliases": ["CS", ...],
+     "plan": {"1": {"Fall": [course, ...], "Spring": [...]}, ...},
+     "prerequisites": {"COSC 1437": ["COSC 1336"], ...}}
+
+compile_catalog() turns them into a flat binary file:
+
+- every string (course codes, plan entries, seasons, major keys) is
+  interned once into a sorted string table, so lookups are binary searches
+  and everything else refers to strings by their index,
+- plans and prerequisites are uint32 arrays (terms point at a range of the
+  course array; prerequisites are stored CSR-style by string index).
+
+Catalog() mmaps that file read-only, so every worker process that loads it
+shares the same page-cache pages and nothing is parsed at import.
+load_catalog() recompiles when a source file is newer than the binary.
+Prerequisite tables are merged across majors (a course has the same
+prerequisites whichever major lists it); majors that disagree about a
+course are reported, and a merged table with a cycle is rejected, since the
+solver and the prerequisite graphs need a DAG.
+"""
+
+import glob
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+CATALOG_DIR = os.getenv("CATALOG_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalogs"))
+CATALOG_PATH = os.getenv("CATALOG_PATH", os.path.join(CATALOG_DIR, "catalog.bin"))
+
+MAGIC = b"CATL"
+VERSION = 1
+# magic, version, byte order (0 little / 1 big), strings, majors, terms, course refs, prereq refs
+HEADER = struct.Struct("<4sHHIIIII")
+MAJOR_FIELDS = 4  # key string, display-name string, first term, term count
+TERM_FIELDS = 4  # year, season string, first course ref, course count
+
+COURSE_CODE_RE = re.compile(r"\b([A-Z]{2,4})\s*(\d{4})\b")  # "COSC 1437" / "COSC1437" in upper-case text
+
+
+def major_key(name: str) -> str:
+    """Lookup key for a major name or alias: lowercase, single spaces."""
+    return " ".join(str(name).lower().split())
+
+
+def normalize_code(code: str) -> str:
+    """Canonical course code: upper case, single spaces ("cosc  2436" -> "COSC 2436")."""
+    return " ".join((code or "").upper().split())
+
+
+# ------------ Compiler -------------------------------------------------
+
+def read_sources(source_dir: str = CATALOG_DIR) -> List[dict]:
+    sources = []
+    for path in sorted(glob.glob(os.path.join(source_dir, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if "major" not in data or "plan" not in data:
+            raise ValueError(f"{path}: catalog files need 'major' and 'plan'.")
+        sources.append(data)
+    return sources
+
+
+def find_cycle(prereqs: Dict[str, set]) -> Optional[List[str]]:
+    """A prerequisite cycle as [a, b, ..., a] (a requires b, ...), or None for a DAG."""
+    state: Dict[str, int] = {}  # 1 = on the current path, 2 = done
+    for root in sorted(prereqs):
+        if root in state:
+            continue
+        path, stack = [root], [iter(sorted(prereqs.get(root, ())))]
+        state[root] = 1
+        while stack:
+            p = next(stack[-1], None)
+            if p is None:
+                state[path.pop()] = 2
+                stack.pop()
+            elif state.get(p) == 1:
+                return path[path.index(p):] + [p]
+            elif p not in state:
+                state[p] = 1
+                path.append(p)
+                stack.append(iter(sorted(prereqs.get(p, ()))))
+    return None
+
+
+def compile_catalog(source_dir: str = CATALOG_DIR, out_path: str = CATALOG_PATH) -> str:
+    """Compile every *.json in source_dir into out_path (written atomically). Returns out_path."""
+    sources = read_sources(source_dir)
+
+    prereqs: Dict[str, set] = {}
+    listed_by: Dict[str, str] = {}  # course -> first major that listed its prerequisites
+    keys: Dict[str, int] = {}  # major key -> index into sources
+    strings = set()
+    for i, src in enumerate(sources):
+        for name in [src["major"]] + list(src.get("aliases", [])):
+            key = major_key(name)
+            if keys.get(key, i) != i:
+                raise ValueError(f"Major name/alias '{name}' is used by two catalog files.")
+            keys[key] = i
+            strings.add(key)
+        strings.add(src["major"])
+        for semesters in src["plan"].values():
+            for season, courses in semesters.items():
+                strings.add(season)
+                strings.update(courses)
+        for code, ps in src.get("prerequisites", {}).items():
+            if code in prereqs and prereqs[code] != set(ps):
+                print(f"Catalog: {src['major']} lists prerequisites {sorted(ps)} for {code}, "
+                      f"{listed_by[code]} lists {sorted(prereqs[code])}; using both.")
+            listed_by.setdefault(code, src["major"])
+            prereqs.setdefault(code, set()).update(ps)
+            strings.add(code)
+            strings.update(ps)
+
+    cycle = find_cycle(prereqs)
+    if cycle:
+        raise ValueError(f"Prerequisite cycle in {source_dir}: {' -> '.join(cycle)}.")
+
+    # Sorted by UTF-8 bytes so the reader can binary-search the mmapped table
+    table = sorted(strings, key=lambda s: s.encode("utf-8"))
+    ids = {s: i for i, s in enumerate(table)}
+
+    blob = bytearray()
+    str_offsets = [0]
+    for s in table:
+        blob += s.encode("utf-8")
+        str_offsets.append(len(blob))
+
+    prereq_offsets, prereq_ids = [0], []
+    for s in table:
+        prereq_ids.extend(sorted(ids[p] for p in prereqs.get(s, ())))
+        prereq_offsets.append(len(prereq_ids))
+
+    term_rows, course_refs, major_span = [], [], []
+    for src in sources:
+        first = len(term_rows) // TERM_FIELDS
+        for year in sorted(src["plan"], key=int):
+            for season, courses in src["plan"][year].items():
+                term_rows += [int(year), ids[season], len(course_refs), len(courses)]
+                course_refs += [ids[c] for c in courses]
+        major_span.append((first, len(term_rows) // TERM_FIELDS - first))
+
+    major_rows = []
+    for key in sorted(keys, key=lambda k: ids[k]):
+        i = keys[key]
+        major_rows += [ids[key], ids[sources[i]["major"]], *major_span[i]]
+
+    header = HEADER.pack(MAGIC, VERSION, 0 if sys.byteorder == "little" else 1, len(table),
+                         len(major_rows) // MAJOR_FIELDS, len(term_rows) // TERM_FIELDS,
+                         len(course_refs), len(prereq_ids))
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        for section in (str_offsets, prereq_offsets, prereq_ids, major_rows, term_rows, course_refs):
+            array("I", section).tofile(f)
+        f.write(bytes(blob))
+    os.replace(tmp, out_path)
+    return out_path
+
+
+# ------------ Reader ---------------------------------------------------
+
+class Catalog:
+    """Read-only view over a compiled catalog file (see compile_catalog)."""
+
+    def __init__(self, path: str = CATALOG_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, order, n_strings, n_majors, n_terms, n_courses, n_prereqs = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a version {VERSION} catalog file.")
+        if order != (0 if sys.byteorder == "little" else 1):
+            self._mm.close()
+            raise ValueError(f"{path} was compiled on a machine with a different byte order.")
+
+        view = memoryview(self._mm)
+        pos = HEADER.size
+
+        def u32(count):
+            nonlocal pos
+            section = view[pos:pos + count * 4].cast("I")
+            pos += count * 4
+            return section
+
+        self._str_offsets = u32(n_strings + 1)
+        self._prereq_offsets = u32(n_strings + 1)
+        self._prereq_ids = u32(n_prereqs)
+        self._majors = u32(n_majors * MAJOR_FIELDS)
+        self._terms = u32(n_terms * TERM_FIELDS)
+        self._courses = u32(n_courses)
+        self._blob = view[pos:]
+        self._view = view
+        self.n_strings = n_strings
+        self.n_majors = n_majors
+        self._required: Optional[frozenset] = None  # string ids that are someone's prerequisite, built on demand
+
+    def close(self):
+        for name in ("_str_offsets", "_prereq_offsets", "_prereq_ids", "_majors", "_terms", "_courses", "_blob"):
+            getattr(self, name).release()
+        self._view.release()
+        self._mm.close()
+
+    # --- strings ---
+
+    def string(self, i: int) -> str:
+        return bytes(self._blob[self._str_offsets[i]:self._str_offsets[i + 1]]).decode("utf-8")
+
+    def string_id(self, s: str) -> int:
+        """Index of `s` in the string table, or -1."""
+        target = s.encode("utf-8")
+        lo, hi = 0, self.n_strings
+        offsets, blob = self._str_offsets, self._blob
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = bytes(blob[offsets[mid]:offsets[mid + 1]])
+            if probe < target:
+                lo = mid + 1
+            elif probe > target:
+                hi = mid
+            else:
+                return mid
+        return -1
+
+    # --- prerequisites ---
+
+    def prerequisites(self, code: str) -> List[str]:
+        i = self.string_id(code)
+        if i < 0:
+            return []
+        return [self.string(p) for p in self._prereq_ids[self._prereq_offsets[i]:self._prereq_offsets[i + 1]]]
+
+    def is_prerequisite(self, code: str) -> bool:
+        """True when some course lists `code` as a prerequisite."""
+        if self._required is None:
+            self._required = frozenset(self._prereq_ids)
+        return self.string_id(code) in self._required
+
+    def prerequisite_table(self) -> Dict[str, List[str]]:
+        """{course: [direct prereqs]} for every course that has any (merged across majors)."""
+        table = {}
+        offsets = self._prereq_offsets
+        for i in range(self.n_strings):
+            if offsets[i] != offsets[i + 1]:
+                table[self.string(i)] = [self.string(p) for p in self._prereq_ids[offsets[i]:offsets[i + 1]]]
+        return table
+
+    # --- majors and plans ---
+
+    def find_major(self, name: str) -> Optional[int]:
+        """Row of the major whose name or alias matches `name`, or None."""
+        key = self.string_id(major_key(name)) if name else -1
+        if key < 0:
+            return None
+        lo, hi = 0, self.n_majors
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = self._majors[mid * MAJOR_FIELDS]
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def major_name(self, row: int) -> str:
+        return self.string(self._majors[row * MAJOR_FIELDS + 1])
+
+    def majors(self) -> List[str]:
+        return sorted({self.major_name(r) for r in range(self.n_majors)})
+
+    def plan(self, row: int) -> List[Tuple[int, str, List[str]]]:
+        """[(year, season, [plan entries])] in catalog order for a major row."""
+        first, count = self._majors[row * MAJOR_FIELDS + 2], self._majors[row * MAJOR_FIELDS + 3]
+        terms, courses = self._terms, self._courses
+        out = []
+        for t in range(first, first + count):
+            year, season, start, n = terms[t * TERM_FIELDS:(t + 1) * TERM_FIELDS]
+            out.append((year, self.string(season), [self.string(c) for c in courses[start:start + n]]))
+        return out
+
+
+def load_catalog(source_dir: str = CATALOG_DIR, path: str = CATALOG_PATH) -> Catalog:
+    """Open the compiled catalog, (re)compiling it first when missing or older than a source file."""
+    sources = glob.glob(os.path.join(source_dir, "*.json"))
+    try:
+        built = os.path.getmtime(path)
+        stale = any(os.path.getmtime(s) > built for s in sources)
+    except OSError:
+        stale = True
+    if stale:
+        try:
+            compile_catalog(source_dir, path)
+        except OSError:
+            # Read-only install: compile next to the other per-host scratch files
+            path = compile_catalog(source_dir, os.path.join(tempfile.gettempdir(), "course-planner-catalog.bin"))
+    try:
+        return Catalog(path)
+    except ValueError:
+        # Written by another version of this module (or on another machine)
+        compile_catalog(source_dir, path)
+        return Catalog(path)
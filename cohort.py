@@ -0,0 +1,161 @@
+# cohort.py
+"""
+Cohort batch planning for POST /api/schedule/build/batch.
+
+An advisor posts one student profile per NDJSON line (courses plus the
+maxCreditsPerTerm/includeSummer/startTerm rules of /schedule/build). Then:
+
+- identical profiles (same courses in any order, ids ignored, same rules;
+  see profile_key) are planned once and the result fans out to every
+  student that shares it;
+- unique profiles are planned by the solver in COHORT_BATCH_CHUNK-sized
+  tasks on the shared process pool (workers.py). Each worker imports
+  validation once, so the catalog (an mmap of catalogs/catalog.bin, shared
+  through the page cache) and the prerequisite graph are built once per
+  process and reused by every task, not rebuilt per student. The pool only
+  pays off with more than one worker and enough work to amortize pickling
+  profiles and results, so below COHORT_POOL_MIN unique profiles (or with a
+  single worker) chunks are planned in-process, one after another, on an
+  executor thread;
+- results are yielded as their chunk finishes, not in input order, with a
+  "progress" event every COHORT_PROGRESS_EVERY students and a final
+  "summary".
+
+Plans here are solver-only; the LLM is not called per student (useLLM
+stays a /schedule/build option).
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import metrics
+import schedule_validation
+import solver
+import workers
+from llm_cache import canonical_request
+
+BATCH_CHUNK = int(os.getenv("COHORT_BATCH_CHUNK", 128))  # unique profiles per task
+POOL_MIN = int(os.getenv("COHORT_POOL_MIN", 1024))  # unique profiles before the process pool is used
+MAX_STUDENTS = int(os.getenv("COHORT_MAX_STUDENTS", 20000))  # lines accepted per request
+PROGRESS_EVERY = int(os.getenv("COHORT_PROGRESS_EVERY", 100))  # students between "progress" events
+RULE_KEYS = ("maxCreditsPerTerm", "includeSummer", "startTerm")
+
+
+def profile_key(profile: Dict[str, Any]) -> str:
+    """Hash of the parts of a profile that decide its plan (not studentId, course ids or order)."""
+    canonical = canonical_request({"courses": profile["courses"], **{k: profile.get(k) for k in RULE_KEYS}})
+    blob = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+# ------------ Worker-side (runs inside the process pool) ---------------
+
+def plan_profile(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """The solver part of a /schedule/build response for one profile."""
+    rules = {"max_credits": profile.get("maxCreditsPerTerm") or solver.DEFAULT_MAX_CREDITS,
+             "include_summer": bool(profile.get("includeSummer")), "start_term": profile.get("startTerm")}
+    result = solver.solve(profile["courses"], **rules)
+    return {
+        "planned_schedule": result["planned_schedule"],
+        "terms": result["terms"],
+        "unscheduled": result["unscheduled"],
+        "warnings": result["warnings"],
+        "reasoning": solver.summarize(result),
+        "stats": result["stats"],
+        "valid": schedule_validation.validate_schedule(
+            result["planned_schedule"], profile["courses"], **rules
+        )["valid"],
+    }
+
+
+def plan_many(profiles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One result per profile; a profile that fails gets {"error": ...} instead of sinking the chunk."""
+    out = []
+    for profile in profiles:
+        try:
+            out.append(plan_profile(profile))
+        except Exception as e:
+            out.append({"error": f"{type(e).__name__}: {e}"})
+    return out
+
+
+# ------------ Orchestration (API process) ------------------------------
+
+async def plan_cohort(profiles: List[Dict[str, Any]], chunk: int = BATCH_CHUNK,
+                      pool_min: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Events for a cohort: "result" (or "error") per profile as its chunk
+    finishes, "progress" every PROGRESS_EVERY profiles, then "summary".
+    Each profile's "line" and "studentId" are echoed so clients can match
+    results that arrive out of order. `pool_min` overrides COHORT_POOL_MIN
+    (benchmarks pass 0 to force the pool).
+    """
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    keys = await loop.run_in_executor(None, lambda: [profile_key(p) for p in profiles])
+    groups: Dict[str, List[int]] = {}  # key -> indexes of the profiles sharing it, first-seen order
+    for i, key in enumerate(keys):
+        groups.setdefault(key, []).append(i)
+    unique = list(groups)
+
+    if pool_min is None:  # a one-worker pool adds IPC and no parallelism
+        pool_min = POOL_MIN if workers.pool_size() > 1 else len(unique) + 1
+    use_pool = len(unique) >= pool_min and len(unique) > chunk
+    pool = workers.get_pool() if use_pool else None
+    parts = [unique[s:s + chunk] for s in range(0, len(unique), chunk)]
+    parts.reverse()  # popped from the end, so in input order
+    tasks = {}
+
+    def submit():
+        part = parts.pop()
+        future = loop.run_in_executor(pool, plan_many, [profiles[groups[k][0]] for k in part])
+        tasks[future] = part
+        return future
+
+    # Pool chunks all go out at once; in-process chunks run one at a time so they do not fight over the GIL
+    done = errors = 0
+    pending = {submit() for _ in range(len(parts) if pool is not None else min(1, len(parts)))}
+    try:
+        while pending:
+            finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if parts:
+                pending.add(submit())
+            for future in finished:
+                try:
+                    results = future.result()
+                except BrokenProcessPool:
+                    # A worker died; the rest of this pool's tasks fail the same way
+                    workers.discard_pool(pool)
+                    results = [{"error": "Planning worker crashed."}] * len(tasks[future])
+                for key, result in zip(tasks[future], results):
+                    for n, i in enumerate(groups[key]):
+                        profile = profiles[i]
+                        kind = "error" if "error" in result else "result"
+                        errors += kind == "error"
+                        outcome = "error" if kind == "error" else "deduplicated" if n else "planned"
+                        metrics.COHORT_STUDENTS.inc(outcome=outcome)
+                        yield {"type": kind, "line": profile.get("line"), "studentId": profile.get("studentId"),
+                               "deduplicated": n > 0, **result}
+                        done += 1
+                        if done % PROGRESS_EVERY == 0 and done < len(profiles):
+                            yield {"type": "progress", "done": done, "total": len(profiles),
+                                   "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)}
+    finally:
+        for future in pending:  # client went away: do not keep planning for nobody
+            future.cancel()
+
+    elapsed = time.perf_counter() - started
+    yield {
+        "type": "summary",
+        "students": len(profiles),
+        "unique_profiles": len(unique),
+        "errors": errors,
+        "workers": workers.pool_size() if pool is not None else 1,
+        "elapsed_ms": round(elapsed * 1000, 3),
+        "students_per_sec": round(len(profiles) / elapsed, 1) if elapsed else None,
+    }
@@ -0,0 +1,218 @@
+# llm_cache.py
+"""
+Content-addressed cache for LLM responses.
+
+Keys are a SHA-256 over a canonical JSON form of the request (courses sorted,
+course ids dropped, prefs normalized) plus the model name and prompt version,
+so the same course list from any student maps to the same entry.
+
+Two tiers: an in-memory LRU with TTL and an entry cap, backed by SQLite so
+hits survive restarts. The API is async: the memory tier is answered on the
+event loop, and SQLite reads and writes run in the default executor so disk
+I/O never blocks it. Concurrent identical requests are coalesced: the first
+caller computes, the others wait for its result (single flight).
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from catalog import normalize_code
+
+DEFAULT_TTL = float(os.getenv("LLM_CACHE_TTL", 24 * 60 * 60))  # seconds
+DEFAULT_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 1024))
+DEFAULT_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.getcwd(), "llm_cache.sqlite3"))
+PRUNE_EVERY = 256  # disk puts between sweeps of expired rows
+
+
+def canonical_request(req: Dict[str, Any]) -> Dict[str, Any]:
+    """Order- and id-independent form of a BuildScheduleRequest dict."""
+    courses = []
+    for c in req.get("courses", []):
+        prefs = dict(c.get("prefs") or {})
+        prefs["days"] = sorted(prefs.get("days") or [])
+        courses.append({
+            "code": normalize_code(str(c.get("code", ""))),
+            "title": c.get("title"),
+            "credits": c.get("credits"),
+            "term": c.get("term"),
+            "status": c.get("status"),
+            "grade": c.get("grade"),
+            "prefs": prefs,
+        })
+    courses.sort(key=lambda c: json.dumps(c, sort_keys=True))
+    rest = {k: v for k, v in req.items() if k not in ("courses", "chatSessionId", "useLLM")}
+    if "pdfIds" in rest:
+        rest["pdfIds"] = sorted(rest["pdfIds"])
+    return {"courses": courses, **rest}
+
+
+def cache_key(req: Dict[str, Any], model: str, prompt_version: str) -> str:
+    payload = {"request": canonical_request(req), "model": model, "prompt_version": prompt_version}
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LeaderCancelled(Exception):
+    """The coroutine computing a shared value was cancelled; waiters retry."""
+
+
+class LLMCache:
+    def __init__(self, path: Optional[str] = DEFAULT_PATH, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()  # memory tier and stats
+        self._db_lock = threading.Lock()  # the SQLite connection, used from executor threads
+        self._inflight: Dict[str, "asyncio.Future"] = {}
+        self._puts = 0
+        self.stats = {"hits_memory": 0, "hits_disk": 0, "misses": 0, "coalesced": 0,
+                      "evictions": 0, "expired": 0}
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    # ------------ Tiers ------------------------------------------------
+
+    def _get_memory(self, key: str, now: float) -> Optional[Any]:
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                if hit[0] > now:
+                    self._mem.move_to_end(key)
+                    self.stats["hits_memory"] += 1
+                    return hit[1]
+                del self._mem[key]
+                self.stats["expired"] += 1
+            return None
+
+    def _get_disk(self, key: str, now: float) -> Optional[Any]:
+        """Runs in an executor thread."""
+        with self._db_lock:
+            row = self._db.execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] <= now:
+            return None
+        value = json.loads(row[0])
+        with self._lock:
+            self._remember(key, value, row[1])
+            self.stats["hits_disk"] += 1
+        return value
+
+    def _put_disk(self, key: str, value: Any, expires_at: float):
+        """Runs in an executor thread."""
+        blob = json.dumps(value)
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, blob, expires_at),
+            )
+            self._puts += 1
+            if self._puts % PRUNE_EVERY == 0:
+                self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+            self._db.commit()
+
+    async def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is None and self._db is not None:
+            value = await asyncio.get_running_loop().run_in_executor(None, self._get_disk, key, now)
+        if value is None:
+            with self._lock:
+                self.stats["misses"] += 1
+        return value
+
+    async def put(self, key: str, value: Any):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+        if self._db is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._put_disk, key, value, expires_at)
+
+    def _remember(self, key: str, value: Any, expires_at: float):
+        self._mem[key] = (expires_at, value)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    # ------------ Single flight ----------------------------------------
+
+    async def aget_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]],
+                              cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Cached value for `key`, or await compute() once however many coroutines
+        ask at the same time. Exceptions propagate to every waiter and are not
+        cached; neither is a value for which cacheable() is False. If the
+        computing coroutine is cancelled, the waiters start over: one of them
+        computes instead.
+        """
+        while True:
+            value = await self.get(key)
+            if value is not None:
+                return value
+
+            with self._lock:
+                pending = self._inflight.get(key)
+                if pending is None:
+                    hit = self._mem.get(key)
+                    if hit is not None and hit[0] > time.time():
+                        return hit[1]
+                    leader = True
+                    pending = self._inflight[key] = asyncio.get_running_loop().create_future()
+                    # Mark the outcome as retrieved even when nobody else was waiting
+                    pending.add_done_callback(lambda f: f.cancelled() or f.exception())
+                else:
+                    leader = False
+                    self.stats["coalesced"] += 1
+            if leader:
+                break
+            try:
+                # shield: one waiter timing out must not cancel the shared result
+                return await asyncio.shield(pending)
+            except LeaderCancelled:
+                continue
+
+        try:
+            value = await compute()
+            if cacheable is None or cacheable(value):
+                await self.put(key, value)
+            pending.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            # Not pending.cancel(): that would cancel every waiter along with this one
+            if not pending.done():
+                pending.set_exception(LeaderCancelled(key))
+            raise
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits_memory"] + self.stats["hits_disk"] + self.stats["misses"]
+            hits = self.stats["hits_memory"] + self.stats["hits_disk"]
+            return {
+                **self.stats,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "entries_memory": len(self._mem),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "inflight": len(self._inflight),
+            }
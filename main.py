@@ -1,31 +1,97 @@
 # main.py
-from fastapi import FastAPI, APIRouter, UploadFile, File, HTTPException
+from fastapi import FastAPI, APIRouter, UploadFile, File, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ValidationError
+from typing import Callable, List, Optional, Dict, Any
 from uuid import uuid4
-import fitz  # PyMuPDF
+import asyncio
+import json
 import os
-
-# 🚨 NEW IMPORTS for LLM and Environment Setup
-from openai import OpenAI, APIError
-from fastapi.responses import JSONResponse
-from dotenv import load_dotenv
-from normalize import normalize_student_input  # 🚨 Import the function
+import threading
+import time
+
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+import solver
+import pdf_ingest
+import pdf_text
+import cohort
+import storage
+import prompts
+import replan
+import sessions
+import schedule_validation
+import workers
+import metrics
+from llm_cache import LLMCache, cache_key
+from preferences2 import router as nlp_router
 
 # ------------ LLM SETUP ----------------------------------------------
 
-load_dotenv()
+# python-dotenv is only imported when there is a .env file to read
+if os.path.exists(".env") or os.path.exists(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")):
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+# The openai package takes longer to import than the rest of the app together,
+# so it is imported, and the client built, on first use. STARTUP_MODE picks when:
+#   warm  - in a background thread once the server is up (default)
+#   lazy  - on the first request that needs the LLM
+#   eager - during startup, before the first request is served
+STARTUP_MODE = os.getenv("STARTUP_MODE", "warm")
+
+_openai = None  # the openai module once imported
+_client = None
+_client_error: Optional[Exception] = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    The AsyncOpenAI client, built on first call. Returns None if it failed to
+    initialize (e.g. no API key); the failure is not retried.
+    Calls from the event loop should use aget_client() instead.
+    """
+    global _openai, _client, _client_error
+    with _client_lock:
+        if _client is None and _client_error is None:
+            try:
+                import openai
+
+                _openai = openai
+                # Calls are awaited on the event loop, so an in-flight completion does not
+                # pin a threadpool worker. Retries are done in call_llm so they can be counted.
+                _client = openai.AsyncOpenAI(max_retries=0)
+            except Exception as e:
+                print(f"FATAL: Failed to initialize OpenAI client. Error: {e}")
+                _client_error = e
+        return _client
+
+
+async def aget_client():
+    """get_client() without blocking the event loop while openai is imported."""
+    if _client is not None or _client_error is not None:
+        return _client
+    return await asyncio.to_thread(get_client)
+
+
+LLM_MODEL = "gpt-4o-mini"
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))  # upstream calls in flight per worker
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE_SECONDS", 15.0))  # whole-request budget, queueing included
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))  # transient failures retried within the deadline
+llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+# Identical schedule requests reuse the stored LLM answer (memory LRU + SQLite)
+llm_cache = LLMCache()
+
+# Last solver plan for builds without a chatSessionId, for incremental PATCH /api/schedule
+plan_store = replan.PlanStore()
 
-# Initialize the modern OpenAI client with error handling
-try:
-    client = OpenAI()
-except Exception as e:
-    print(f"FATAL: Failed to initialize OpenAI client. Error: {e}")
-    client = None
+# Per-chatSessionId turns, normalized schema and last plan (LRU under a byte cap, spilled to SQLite)
+session_store = sessions.SessionStore()
 
 
-# ------------ Models (No changes, reused from preferences2.py) ------
+# ------------ Models ------------------------------------------------
 
 class Prefs(BaseModel):
     days: List[str] = []
@@ -61,14 +127,55 @@ class Course(CourseBase):
     id: str
 
 
+class CourseBulkUpdate(BaseModel):
+    id: str
+    patch: CourseUpdate
+
+
+class CourseBulkRequest(BaseModel):
+    create: List[CourseCreate] = []
+    update: List[CourseBulkUpdate] = []
+    delete: List[str] = []
+
+
 class BuildScheduleRequest(BaseModel):
     courses: List[Course]
     pdfIds: List[str] = []
     chatSessionId: Optional[str] = None
+    maxCreditsPerTerm: int = Field(default=solver.DEFAULT_MAX_CREDITS, gt=0)
+    includeSummer: bool = False
+    startTerm: Optional[str] = None  # e.g., "Spring 2026"; defaults to the upcoming term
+    useLLM: bool = False  # opt-in: have the LLM write the reasoning for the solver's plan
+
+
+class ScheduleChange(BaseModel):
+    planId: str  # from /schedule/build (the chatSessionId when one was sent)
+    create: List[CourseCreate] = []
+    update: List[CourseBulkUpdate] = []
+    delete: List[str] = []
 
 
-class NLPInput(BaseModel):
-    text: Optional[str] = None
+class ScheduleValidationRequest(BaseModel):
+    planned_schedule: List[Dict[str, Any]]  # entries as returned by /schedule/build (code, suggested_term, ...)
+    courses: List[Course]
+    maxCreditsPerTerm: int = Field(default=solver.DEFAULT_MAX_CREDITS, gt=0)
+    includeSummer: bool = False
+    startTerm: Optional[str] = None
+    repair: bool = True
+
+
+class ScheduleValidationBatch(BaseModel):
+    items: List[ScheduleValidationRequest]
+    repair: bool = False
+
+
+class CohortStudent(BaseModel):
+    """One NDJSON line of /schedule/build/batch."""
+    studentId: Optional[str] = None
+    courses: List[CourseCreate]
+    maxCreditsPerTerm: int = Field(default=solver.DEFAULT_MAX_CREDITS, gt=0)
+    includeSummer: bool = False
+    startTerm: Optional[str] = None
 
 
 # ------------ App setup ----------------------------------------------
@@ -87,6 +194,7 @@ origins = [
     "http://localhost:3000",  # CRA / Next dev
 ]
 
+app.add_middleware(metrics.MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -95,160 +203,653 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory "DB"
-memory_db: Dict[str, Any] = {
-    "courses": {},  # id -> Course
-    "pdf_store": {},  # id -> {"filename": ..., "text": ...}
-}
-
-
-# ------------ Helpers (No changes) -----------------------------------
+# Courses live in a pluggable store (SQLite in WAL mode by default, see storage.py)
+course_store = storage.open_course_store()
+COURSES_PAGE_SIZE = int(os.getenv("COURSES_PAGE_SIZE", 100))  # GET /api/courses page when only a cursor is given
 
-def extract_pdf_text(file_path: str) -> str:
-    text = ""
-    # Assuming fitz is imported, otherwise this function will cause an error if called
-    with fitz.open(file_path) as doc:
-        for page in doc:
-            text += page.get_text("text")
-    return text
+# Extracted PDF text: compressed on disk with a bounded page cache and a course/term index (pdf_text.py)
+pdf_store = pdf_text.open_pdf_store()
+app.state.pdf_store = pdf_store  # read by the NLP router (preferences2.py)
+app.state.sessions = session_store  # likewise
 
 
-# ------------ Courses CRUD (No changes) ------------------------------
+# ------------ Courses CRUD ------------------------------------------
 
 @router.get("/courses", response_model=List[Course])
-def list_courses():
-    return list(memory_db["courses"].values())
+def list_courses(
+    response: Response,
+    limit: Optional[int] = Query(default=None, gt=0, le=1000),
+    cursor: Optional[str] = None,
+    code: Optional[str] = None,
+    term: Optional[str] = None,
+    status: Optional[str] = None,
+):
+    """
+    Course list, ordered by code. Without limit or cursor every course is
+    returned, as before. With either it is keyset-paginated (limit defaults
+    to COURSES_PAGE_SIZE), and when more rows exist the X-Next-Cursor header
+    holds the cursor for the next page.
+    """
+    if cursor is not None and limit is None:
+        limit = COURSES_PAGE_SIZE
+    try:
+        rows, next_cursor = course_store.list(limit=limit, after=cursor, code=code, term=term, status=status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
 
 
 @router.post("/courses", response_model=Course, status_code=201)
 def create_course(payload: CourseCreate):
     new_id = str(uuid4())
     course = Course(id=new_id, **payload.dict())
-    memory_db["courses"][new_id] = course
+    course_store.put(course.dict())
     return course
 
 
 @router.put("/courses/{course_id}", response_model=Course)
 def update_course(course_id: str, patch: CourseUpdate):
-    if course_id not in memory_db["courses"]:
+    current = course_store.get(course_id)
+    if current is None:
         raise HTTPException(status_code=404, detail="Course not found")
-    current: Course = memory_db["courses"][course_id]
-    data = current.dict()
+    data = dict(current)
     patch_dict = patch.dict(exclude_unset=True)
     data.update(patch_dict)
     updated = Course(**data)
-    memory_db["courses"][course_id] = updated
+    course_store.put(updated.dict())
     return updated
 
 
 @router.delete("/courses/{course_id}", status_code=204)
 def delete_course(course_id: str):
-    if course_id not in memory_db["courses"]:
+    if not course_store.delete(course_id):
         raise HTTPException(status_code=404, detail="Course not found")
-    del memory_db["courses"][course_id]
     return
 
 
-# ------------ File uploads (PDF) (No changes) ------------------------
+@router.post("/courses/bulk")
+def bulk_courses(req: CourseBulkRequest):
+    """
+    Creates, updates and deletes many courses in one transaction.
+    If any id is unknown nothing is applied and the response is 404; if an
+    updated course is no longer a valid Course, likewise with 422.
+    """
+    create = [{"id": str(uuid4()), **c.dict()} for c in req.create]
+    update = [(u.id, u.patch.dict(exclude_unset=True)) for u in req.update]
+    try:
+        return course_store.bulk(create, update, req.delete, validate=lambda row: Course(**row).dict())
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Course not found: {e.args[0]}")
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+
+
+# ------------ File uploads (PDF) --------------------------------------
 
 UPLOAD_DIR = os.path.join(os.getcwd(), "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
-@router.post("/uploads/pdf")
+@router.post("/uploads/pdf", status_code=202)
 async def upload_pdf(file: UploadFile = File(...)):
+    """
+    Streams the upload to disk and queues text extraction in the background.
+    Returns the job right away; poll /uploads/jobs/{jobId} until status is "done".
+    Re-uploading an identical PDF returns the existing job instead of parsing again.
+    """
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are supported.")
 
-    path = os.path.join(UPLOAD_DIR, file.filename)
-    with open(path, "wb") as f:
-        f.write(await file.read())
+    saved = await pdf_ingest.save_upload(file, UPLOAD_DIR)
+    return pdf_ingest.start_job(saved, file.filename, pdf_store)
+
+
+@router.get("/uploads/jobs/{job_id}")
+def get_upload_job(job_id: str):
+    if job_id not in pdf_ingest.jobs:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return pdf_ingest.public_job(job_id)
+
+
+@app.on_event("startup")
+async def warm_up():
+    if STARTUP_MODE == "eager":
+        get_client()
+    elif STARTUP_MODE == "warm":
+        app.state.warm_up = asyncio.create_task(aget_client())
+
 
-    # NOTE: extract_pdf_text will cause an error if fitz is not installed
-    text = extract_pdf_text(path)
-    pdf_id = str(uuid4())
-    memory_db["pdf_store"][pdf_id] = {"filename": file.filename, "text": text}
-    return {"id": pdf_id, "filename": file.filename, "chars": len(text)}
+@app.on_event("shutdown")
+def shutdown_worker_pool():
+    workers.shutdown_pool()
 
 
-# ------------ NLP preferences (NOW USING normalize.py) -----------------
+# ------------ Build schedule (SOLVER + optional LLM) ---------------------------
 
-@router.post("/nlp/preferences")
-def extract_preferences(user_input: NLPInput):
+def solve_request(req: BuildScheduleRequest) -> dict:
+    """Runs the local constraint solver (solver.py) on a schedule request."""
+    return solver.solve(
+        [c.dict() for c in req.courses],
+        max_credits=req.maxCreditsPerTerm,
+        include_summer=req.includeSummer,
+        start_term=req.startTerm,
+    )
+
+
+async def remember_plan(req: BuildScheduleRequest, result: dict) -> str:
     """
-    Uses normalize.py to standardize raw text input before any LLM processing.
+    Keeps the solver plan for PATCH /schedule; returns its planId. With a
+    chatSessionId the plan is the session's last plan and the planId is the
+    session id.
     """
-    # Requires normalize.py to be present and properly imported
-    normalized_data = normalize_student_input(user_input.text)
+    state = replan.PlanState.from_result([c.dict() for c in req.courses], result, req.maxCreditsPerTerm,
+                                         req.includeSummer, req.startTerm)
+    if req.chatSessionId:
+        await asyncio.to_thread(session_store.set_plan, req.chatSessionId, state)
+        return req.chatSessionId
+    plan_id = str(uuid4())
+    plan_store.put(plan_id, state)
+    return plan_id
 
-    # 🚨 This is where you would call the LLM to extract major/graduation date from text
 
-    return {
-        "message": "Data normalized successfully (LLM extraction step skipped for now)",
-        "input": user_input.text,
-        "normalized_schema": normalized_data,
-    }
+async def session_context(req: BuildScheduleRequest) -> dict:
+    """The session's bounded prompt context (empty without a chatSessionId)."""
+    session = await asyncio.to_thread(session_store.get, req.chatSessionId) if req.chatSessionId else None
+    return session.context() if session else {}
+
+
+async def remember_turn(req: BuildScheduleRequest, reasoning: str):
+    if req.chatSessionId:
+        # Session writes encode JSON and may spill to SQLite; keep them off the event loop
+        await asyncio.to_thread(session_store.add_turn, req.chatSessionId, "assistant", reasoning)
+
+
+def llm_cache_key(req: BuildScheduleRequest, context: dict) -> str:
+    # The session context is part of the prompt, so it is part of the key (chatSessionId itself is not)
+    return cache_key({**req.dict(), "session": context} if context else req.dict(), LLM_MODEL,
+                     prompts.PROMPT_VERSION)
+
+
+def pdf_excerpts(req: BuildScheduleRequest) -> List[dict]:
+    """
+    Snippets of the request's uploads (pdfIds) that mention its courses, planned
+    courses first, within pdf_text.SNIPPET_BUDGET characters. 404 on an unknown id.
+    Reads SQLite and decompresses pages, so callers run it in a thread.
+    """
+    for pdf_id in req.pdfIds:
+        if pdf_id not in pdf_store:
+            raise HTTPException(status_code=404, detail=f"PDF not found: {pdf_id}")
+    if not req.pdfIds:
+        return []
+    courses = sorted(req.courses, key=lambda c: c.status == "completed")
+    return pdf_store.snippets(req.pdfIds, [c.code for c in courses])
+
+
+def validation_rules(req) -> dict:
+    return {"max_credits": req.maxCreditsPerTerm, "include_summer": req.includeSummer, "start_term": req.startTerm}
 
 
-# ------------ Build schedule (LLM INTEGRATION) ---------------------------------
+def check_ai_output(req: BuildScheduleRequest, ai_output: dict) -> tuple:
+    """
+    (ai_output with a validated/repaired planned_schedule, validation report).
+    The cached answer is left untouched; a copy carries the repaired schedule.
+    """
+    checked = schedule_validation.check_schedule(
+        ai_output.get("planned_schedule") or [], [c.dict() for c in req.courses], **validation_rules(req)
+    )
+    report = {k: checked[k] for k in ("valid", "violations", "repaired", "moves", "dropped", "remaining")}
+    return {**ai_output, "planned_schedule": checked["planned_schedule"]}, report
+
+
+def cacheable_answer(req: BuildScheduleRequest) -> Callable[[dict], bool]:
+    """Only LLM answers whose schedule passes validation go into llm_cache; a bad one is asked again next time."""
+    courses, rules = [c.dict() for c in req.courses], validation_rules(req)
+    return lambda ai_output: schedule_validation.check_schedule(
+        ai_output.get("planned_schedule") or [], courses, repair=False, **rules
+    )["valid"]
+
+
+def remaining_budget(deadline: float) -> float:
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise asyncio.TimeoutError()
+    return left
+
+
+def record_usage(usage) -> None:
+    if usage is not None:
+        metrics.LLM_TOKENS.inc(usage.prompt_tokens or 0, kind="prompt")
+        metrics.LLM_TOKENS.inc(usage.completion_tokens or 0, kind="completion")
+
+
+def transient_llm_errors() -> tuple:
+    return (_openai.APIConnectionError, _openai.InternalServerError, _openai.RateLimitError)
+
+
+async def call_llm(messages: List[Dict[str, str]], deadline: float) -> dict:
+    """
+    One JSON-mode completion, bounded by the concurrency semaphore and the request
+    deadline, retrying transient errors with backoff. Returns the parsed JSON object.
+    """
+    client = await aget_client()
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        await asyncio.wait_for(llm_semaphore.acquire(), timeout=remaining_budget(deadline))
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            left = remaining_budget(deadline)
+            llm_response = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model=LLM_MODEL,
+                    messages=messages,
+                    response_format={"type": "json_object"},
+                    timeout=left,
+                ),
+                timeout=left,
+            )
+            outcome = "ok"
+            record_usage(llm_response.usage)
+            return prompts.parse_response(llm_response.choices[0].message.content)
+        except transient_llm_errors() as e:
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            metrics.LLM_RETRIES.inc(reason=type(e).__name__)
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise
+        finally:
+            metrics.LLM_LATENCY.observe(time.perf_counter() - started, endpoint="completion", outcome=outcome)
+            llm_semaphore.release()
+        await asyncio.sleep(min(0.5 * 2 ** attempt, remaining_budget(deadline)))
+
+
+async def call_llm_split(payloads: List[dict], deadline: float) -> dict:
+    """Runs the term-sized sub-requests concurrently and merges their answers."""
+    parts = await asyncio.gather(*(call_llm(prompts.build_messages(p), deadline) for p in payloads))
+    return prompts.merge_responses(list(parts))
+
+
+def llm_error_detail(e: Exception) -> tuple:
+    """(status_code, detail) for an exception raised while calling the LLM."""
+    if isinstance(e, asyncio.TimeoutError):
+        return 504, f"LLM deadline of {LLM_DEADLINE:g}s exceeded."
+    if _openai is not None and isinstance(e, _openai.APIError):
+        body = e.body if isinstance(getattr(e, "body", None), dict) else {}
+        error_message = body.get("message") or body.get("error", {}).get("message") or e.message
+        status_code = getattr(e, "status_code", None) or 500
+        print(f"OpenAI API Error ({status_code}): {error_message}")
+        return status_code, f"OpenAI API Error: {error_message}"
+    if isinstance(e, ValueError):  # includes json.JSONDecodeError from parse_response
+        print(f"LLM returned malformed JSON: {e}")
+        return 502, f"LLM returned malformed JSON: {e}"
+    print(f"FATAL SERVER CRASH during API call: {e}")
+    return 500, f"Internal Server Crash: {e}"
+
 
 @router.post("/schedule/build")
-def build_schedule(req: BuildScheduleRequest):
+async def build_schedule(req: BuildScheduleRequest):
     """
-    Calls the LLM/solver with full course list and preferences.
+    Builds the schedule with the local constraint solver (solver.py).
+    The LLM is only called when the request sets useLLM; its answer comes back
+    as a parsed JSON object in ai_response, with its planned_schedule checked
+    and, where needed, repaired by schedule_validation. "validation" reports
+    what was checked (the solver's schedule, or the LLM's).
     """
-    if client is None:
+    # The solver is CPU-bound (tens of ms for large plans); keep it off the event loop
+    result = await asyncio.to_thread(solve_request, req)
+    report = await asyncio.to_thread(
+        schedule_validation.validate_schedule,
+        result["planned_schedule"], [c.dict() for c in req.courses], **validation_rules(req)
+    )
+    response = {
+        "planId": await remember_plan(req, result),
+        "engine": "solver",
+        "planned_schedule": result["planned_schedule"],
+        "terms": result["terms"],
+        "unscheduled": result["unscheduled"],
+        "warnings": result["warnings"],
+        "reasoning": solver.summarize(result),
+        "stats": result["stats"],
+        "validation": report,
+    }
+    if not req.useLLM:
+        await remember_turn(req, response["reasoning"])
+        return response
+
+    if await aget_client() is None:
         return JSONResponse(
             status_code=500,
-            content={"detail": "OpenAI client failed to initialize at startup."}
+            content={"detail": "OpenAI client failed to initialize."}
         )
 
-    # 1. Extract necessary data from the new, complex model
-    taken_classes = [c.code for c in req.courses if c.status == "completed"]
-    available_classes = [c.code for c in req.courses if c.status == "planned"]
-    all_courses_data = [c.dict() for c in req.courses]
+    # Compact prompt (plus excerpts from the referenced uploads), split into
+    # term-sized sub-requests when over the token budget
+    excerpts = await asyncio.to_thread(pdf_excerpts, req)
+    context = await session_context(req)
+    payloads = prompts.split_payload(
+        prompts.encode_request([c.dict() for c in req.courses], result, excerpts, context)
+    )
+    deadline = time.monotonic() + LLM_DEADLINE
 
-    # 2. Build the detailed prompt for the LLM
-    prompt = f"""
-    You are an AI academic scheduling assistant. 
-    The student's full list of courses and current status is: {all_courses_data}
-    Specifically, classes already taken are: {taken_classes}.
-    Classes that still need to be scheduled are: {available_classes}.
+    # Call the API (or reuse a cached answer) with error handling
+    try:
+        key = llm_cache_key(req, context)
+        ai_output = await llm_cache.aget_or_compute(key, lambda: call_llm_split(payloads, deadline),
+                                                    cacheable_answer(req))
+
+        response["engine"] = "solver+llm"
+        response["ai_response"], response["validation"] = check_ai_output(req, ai_output)
+        response["stats"]["llm_requests"] = len(payloads)
+        response["stats"]["prompt_tokens"] = sum(prompts.message_tokens(prompts.build_messages(p)) for p in payloads)
+        response["stats"]["pdf_excerpts"] = len(excerpts)
+        await remember_turn(req, response["ai_response"].get("reasoning") or response["reasoning"])
+        return response
 
-    The student's preferences are embedded within the 'prefs' field of the course objects (days, timeOfDay, modality).
-    Your task is to organize all 'planned' courses into a valid, plausible semester schedule.
+    except Exception as e:
+        status_code, detail = llm_error_detail(e)
+        return JSONResponse(status_code=status_code, content={"detail": detail})
+
+
+def sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
-    Respond in JSON format. The JSON should contain a key 'planned_schedule' which is a list 
-    of dictionary objects, one for each course, and a key 'reasoning' explaining the choices.
-    Each course object in 'planned_schedule' must include the course 'code' and a new 
-    'suggested_term' field (e.g., 'Fall 2025', 'Spring 2026').
-    """
 
-    # 3. Call the API with error handling
+@router.post("/schedule/build/stream")
+async def build_schedule_stream(req: BuildScheduleRequest):
+    """
+    Server-Sent Events version of /schedule/build.
+
+    Events, in order: one "course" per planned_schedule entry from the solver,
+    "plan" with the full solver result, then (with useLLM) "token" chunks of
+    the LLM's JSON as they arrive, "llm" with the parsed object (its schedule
+    validated and repaired) and "validation" with the report, and finally
+    "done" (or "error"). Requests split into several sub-requests skip the
+    "token" events.
+    """
+    # Unknown pdfIds fail before the stream starts
+    excerpts = await asyncio.to_thread(pdf_excerpts, req) if req.useLLM else []
+
+    async def events():
+        result = await asyncio.to_thread(solve_request, req)
+        for entry in result["planned_schedule"]:
+            yield sse("course", entry)
+        plan_id = await remember_plan(req, result)
+        yield sse("plan", {**result, "reasoning": solver.summarize(result), "planId": plan_id})
+
+        if req.useLLM:
+            client = await aget_client()
+            if client is None:
+                yield sse("error", {"status": 500, "detail": "OpenAI client failed to initialize."})
+                return
+            context = await session_context(req)
+            key = llm_cache_key(req, context)
+            payloads = prompts.split_payload(
+                prompts.encode_request([c.dict() for c in req.courses], result, excerpts, context)
+            )
+            deadline = time.monotonic() + LLM_DEADLINE
+            ai_output = await llm_cache.get(key)
+            try:
+                if ai_output is None and len(payloads) > 1:
+                    ai_output = await llm_cache.aget_or_compute(key, lambda: call_llm_split(payloads, deadline),
+                                                                cacheable_answer(req))
+                elif ai_output is None:
+                    parts = []
+                    await asyncio.wait_for(llm_semaphore.acquire(), timeout=remaining_budget(deadline))
+                    started = time.perf_counter()
+                    outcome = "error"
+                    try:
+                        stream = await client.chat.completions.create(
+                            model=LLM_MODEL,
+                            messages=prompts.build_messages(payloads[0]),
+                            response_format={"type": "json_object"},
+                            timeout=remaining_budget(deadline),
+                            stream=True,
+                            stream_options={"include_usage": True},
+                        )
+                        async for chunk in stream:
+                            remaining_budget(deadline)
+                            record_usage(getattr(chunk, "usage", None))
+                            text = chunk.choices[0].delta.content if chunk.choices else None
+                            if text:
+                                parts.append(text)
+                                yield sse("token", {"text": text})
+                        outcome = "ok"
+                    finally:
+                        metrics.LLM_LATENCY.observe(time.perf_counter() - started, endpoint="stream", outcome=outcome)
+                        llm_semaphore.release()
+                    ai_output = prompts.parse_response("".join(parts))
+                    if cacheable_answer(req)(ai_output):
+                        await llm_cache.put(key, ai_output)
+                ai_output, report = check_ai_output(req, ai_output)
+            except Exception as e:
+                status_code, detail = llm_error_detail(e)
+                yield sse("error", {"status": status_code, "detail": detail})
+                return
+            await remember_turn(req, ai_output.get("reasoning") or solver.summarize(result))
+            yield sse("llm", ai_output)
+            yield sse("validation", report)
+        else:
+            await remember_turn(req, solver.summarize(result))
+        yield sse("done", {"engine": "solver+llm" if req.useLLM else "solver"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def parse_cohort(raws: List[bytes], first_line: int = 1) -> tuple:
+    """
+    (profiles, error events) from NDJSON lines numbered from `first_line`;
+    blank lines are skipped, bad lines become errors.
+    """
+    profiles, errors = [], []
+    for line, raw in enumerate(raws, first_line):
+        if not raw.strip():
+            continue
+        data = None
+        try:
+            data = json.loads(raw)
+            student = CohortStudent(**data)
+        except (ValueError, TypeError) as e:  # json.JSONDecodeError and pydantic's ValidationError are ValueErrors
+            detail = e.errors() if isinstance(e, ValidationError) else str(e)
+            student_id = data.get("studentId") if isinstance(data, dict) else None
+            errors.append({"type": "error", "line": line, "studentId": student_id, "detail": detail})
+            continue
+        profiles.append({"line": line, **student.dict()})
+    return profiles, errors
+
+
+@router.post("/schedule/build/batch")
+async def build_schedule_batch(request: Request):
+    """
+    Plans a whole cohort in one job. The body is NDJSON, one student per line:
+    {"studentId", "courses", "maxCreditsPerTerm", "includeSummer", "startTerm"}.
+    The response is NDJSON streamed as students finish (not in input order):
+    "result" lines with the solver plan plus "line" and "studentId", "error"
+    lines for unparseable or failed students, "progress" lines, and a final
+    "summary". Identical profiles are planned once (see cohort.py). "line"
+    is the 1-based line number in the request body.
+    """
+    # Lines are parsed as the body arrives, a received chunk at a time, instead
+    # of after buffering it all; parsing is CPU work, so it runs off the event loop
+    loop = asyncio.get_running_loop()
+    profiles, errors = [], []
+    partial: List[bytes] = []  # pieces of a line that has not ended yet
+    seen = 0  # lines handed to parse_cohort so far
+
+    async def take(raws: List[bytes]):
+        nonlocal seen
+        if seen + len(raws) > cohort.MAX_STUDENTS:
+            raise HTTPException(status_code=413, detail=f"At most {cohort.MAX_STUDENTS} lines per batch.")
+        parsed, bad = await loop.run_in_executor(None, parse_cohort, raws, seen + 1)
+        profiles.extend(parsed)
+        errors.extend(bad)
+        seen += len(raws)
+
+    async for chunk in request.stream():
+        if b"\n" not in chunk:
+            partial.append(chunk)
+            continue
+        raws = b"".join(partial + [chunk]).split(b"\n")
+        partial = [raws.pop()]
+        await take(raws)
+    tail = b"".join(partial)
+    if tail.strip():
+        await take([tail])
+
+    async def lines():
+        for event in errors:
+            metrics.COHORT_STUDENTS.inc(outcome="error")
+            yield json.dumps(event, default=str) + "\n"
+        async for event in cohort.plan_cohort(profiles):
+            if event["type"] == "summary":
+                event["students"] += len(errors)
+                event["errors"] += len(errors)
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+
+@router.patch("/schedule")
+def patch_schedule(change: ScheduleChange):
+    """
+    Applies course creates/updates/deletes to a plan built by /schedule/build and
+    replans incrementally: only the changed courses and their dependents are
+    placed again (see replan.py). Returns the updated plan plus a delta of
+    added/removed/moved/retimed courses. The LLM is not called again.
+    """
+    session = session_store.get(change.planId)
+    state = session.plan if session is not None and session.plan is not None else plan_store.get(change.planId)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Plan not found; build it with /schedule/build first.")
+    create = [{"id": str(uuid4()), **c.dict()} for c in change.create]
+    update = [(u.id, u.patch.dict(exclude_unset=True)) for u in change.update]
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            timeout=15.0
-        )
+        courses = replan.apply_changes(state.courses, create, update, change.delete)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Course not found: {e.args[0]}")
+    updated = {u.id for u in change.update}
+    try:
+        courses = [Course(**c).dict() if c["id"] in updated else c for c in courses]
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+
+    new_state, stats = replan.replan(state, courses)
+    if session is not None and session.plan is not None:
+        session_store.set_plan(change.planId, new_state)
+    else:
+        plan_store.put(change.planId, new_state)
+    result = new_state.result(stats)
+    return {
+        "planId": change.planId,
+        "engine": "solver",
+        "planned_schedule": result["planned_schedule"],
+        "terms": result["terms"],
+        "unscheduled": result["unscheduled"],
+        "warnings": result["warnings"],
+        "reasoning": solver.summarize(result),
+        "stats": stats,
+        "delta": replan.delta(state, new_state),
+    }
 
-        ai_output = response.choices[0].message.content
 
-        return {"ai_response": ai_output}
+VALIDATE_BATCH_CHUNK = 500  # schedules per worker task; smaller batches stay in-process
 
-    except APIError as e:
-        error_message = e.response.json().get('error', {}).get('message', 'Unknown API Error')
-        print(f"OpenAI API Error ({e.status_code}): {error_message}")
-        return JSONResponse(
-            status_code=e.status_code if e.status_code is not None else 500,
-            content={"detail": f"OpenAI API Error: {error_message}"}
-        )
-    except Exception as e:
-        print(f"FATAL SERVER CRASH during API call: {e}")
-        return JSONResponse(
-            status_code=500,
-            content={"detail": f"Internal Server Crash: {e}"}
-        )
+
+@router.post("/schedule/validate")
+def validate_schedule(req: ScheduleValidationRequest):
+    """
+    Checks a proposed schedule against prerequisites, term order, the credit
+    limit and each course's prefs. With repair (the default) the response also
+    holds the minimally repaired planned_schedule and the moves made.
+    """
+    return schedule_validation.check_schedule(
+        req.planned_schedule, [c.dict() for c in req.courses], req.repair, **validation_rules(req)
+    )
+
+
+@router.post("/schedule/validate/batch")
+async def validate_schedule_batch(body: ScheduleValidationBatch):
+    """
+    Validates many schedules per request (offline audits). Results come back in
+    input order; large batches are split across the shared worker pool.
+    """
+    items = [item.dict() for item in body.items]
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    if len(items) <= VALIDATE_BATCH_CHUNK:
+        results = await loop.run_in_executor(None, schedule_validation.validate_many, items, body.repair)
+    else:
+        pool = workers.get_pool()
+        chunks = [items[i:i + VALIDATE_BATCH_CHUNK] for i in range(0, len(items), VALIDATE_BATCH_CHUNK)]
+        parts = await asyncio.gather(*(
+            loop.run_in_executor(pool, schedule_validation.validate_many, c, body.repair) for c in chunks
+        ))
+        results = [r for part in parts for r in part]
+
+    return {
+        "count": len(results),
+        "valid": sum(1 for r in results if r["valid"]),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        "results": results,
+    }
+
+
+@router.get("/schedule/cache/stats")
+def schedule_cache_stats():
+    """Hit/miss/eviction counters for the LLM response cache."""
+    return llm_cache.snapshot()
+
+
+# ------------ Chat sessions -----------------------------------------
+
+@router.get("/sessions/{session_id}")
+def get_session(session_id: str):
+    """Turns, compacted summary, merged normalized schema and whether a plan is kept."""
+    snapshot = session_store.snapshot(session_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return snapshot
+
+
+@router.delete("/sessions/{session_id}", status_code=204)
+def delete_session(session_id: str):
+    if not session_store.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return
 
 
-app.include_router(router)
\ No newline at end of file
+# ------------ Metrics ------------------------------------------------
+
+metrics.REGISTRY.gauge("courses_stored", "Courses in the course store.", callback=course_store.count)
+metrics.REGISTRY.gauge("pdf_store_documents", "Extracted PDFs in the PDF text store.", callback=pdf_store.count)
+metrics.REGISTRY.gauge("pdf_store_chars", "Characters of extracted PDF text in the store (on disk).",
+                       callback=lambda: pdf_store.stats()["chars"])
+metrics.REGISTRY.gauge("pdf_store_disk_bytes", "Bytes of compressed PDF text on disk.",
+                       callback=lambda: pdf_store.stats()["disk_bytes"])
+metrics.REGISTRY.gauge("pdf_cache_chars", "Characters of PDF text held in the in-memory page cache.",
+                       callback=lambda: pdf_store.stats()["cached_chars"])
+metrics.REGISTRY.gauge("plans_stored", "Plans kept for incremental PATCH /api/schedule.",
+                       callback=lambda: len(plan_store))
+metrics.REGISTRY.gauge("sessions_in_memory", "Chat sessions held in memory.", callback=lambda: len(session_store))
+metrics.REGISTRY.gauge("sessions_memory_bytes", "Approximate bytes of chat sessions held in memory.",
+                       callback=lambda: session_store.memory_bytes)
+for _stat in ("evictions", "spilled", "restored", "expired"):
+    metrics.REGISTRY.gauge(f"sessions_{_stat}", f"Chat session store counter '{_stat}'.",
+                           callback=lambda _stat=_stat: session_store.stats[_stat])
+for _stat in ("hits_memory", "hits_disk", "misses", "coalesced", "evictions"):
+    metrics.REGISTRY.gauge(f"llm_cache_{_stat}", f"LLM response cache counter '{_stat}'.",
+                           callback=lambda _stat=_stat: llm_cache.stats[_stat])
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+app.include_router(router)
+app.include_router(nlp_router)
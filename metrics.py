@@ -0,0 +1,337 @@
+# metrics.py
+"""
+In-process metrics in the Prometheus text format, plus an opt-in sampling profiler.
+
+- Counter / Gauge / Histogram: thread-safe, labelled, rendered by
+  REGISTRY.render() for the /metrics endpoint. Gauges can also be computed
+  at scrape time from a callback (e.g. the number of stored courses).
+- MetricsMiddleware: pure ASGI middleware that records per-route latency
+  histograms, request counts by status, and in-flight requests. Streaming
+  responses are timed until their last byte.
+- SamplingProfiler: when PROFILING_ENABLED=1, a request carrying the header
+  "X-Profile: 1" (or ?profile=1) is sampled every few milliseconds and
+  written as collapsed stacks (<PROFILE_DIR>/*.folded), which flamegraph.pl,
+  speedscope and inferno read directly.
+"""
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(os.getcwd(), "profiles"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", 5)) / 1000
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, doc, labelnames=()):
+        super().__init__(name, doc, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, doc, labelnames=(), callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, doc, labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self) -> List[str]:
+        if self.callback is not None:
+            try:
+                return self.header() + [f"{self.name} {_num(self.callback())}"]
+            except Exception as e:
+                print(f"Metric callback for {self.name} failed: {e}")
+                return []
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, doc, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[Tuple, list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        lines = self.header()
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_num(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_num(series[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, doc, labelnames=()) -> Counter:
+        return self.register(Counter(name, doc, labelnames))
+
+    def gauge(self, name, doc, labelnames=(), callback=None) -> Gauge:
+        return self.register(Gauge(name, doc, labelnames, callback))
+
+    def histogram(self, name, doc, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, doc, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ------------ Metrics used across the app -----------------------------
+
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "HTTP requests by route and status.",
+                                 ("method", "route", "status"))
+HTTP_LATENCY = REGISTRY.histogram("http_request_duration_seconds", "HTTP request latency, until the last byte.",
+                                  ("method", "route"))
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "HTTP requests currently being served.",
+                                ("method", "route"))
+PDF_PAGE_SECONDS = REGISTRY.histogram("pdf_extract_page_seconds", "PyMuPDF text extraction time per page.",
+                                      buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+LLM_LATENCY = REGISTRY.histogram("llm_request_duration_seconds", "Upstream LLM call latency.",
+                                 ("endpoint", "outcome"))
+LLM_TOKENS = REGISTRY.counter("llm_tokens_total", "Tokens reported by the LLM API.", ("kind",))
+LLM_RETRIES = REGISTRY.counter("llm_retries_total", "LLM calls retried after a transient error.", ("reason",))
+COHORT_STUDENTS = REGISTRY.counter("cohort_students_total", "Students answered by /api/schedule/build/batch.",
+                                   ("outcome",))
+
+
+# ------------ ASGI middleware -----------------------------------------
+
+class MetricsMiddleware:
+    """
+    Per-route latency, status counts and in-flight gauge for every HTTP request.
+
+    The route label is the templated path ("/api/courses/{course_id}") that the
+    router stores in scope["route"], which keeps label cardinality bounded. A
+    request joins the in-flight gauge as soon as it arrives, under route
+    "pending", and moves to its route label at its first receive/send once
+    routing has set it (a GET that sends only at the end stays "pending" until
+    then, but is counted the whole time).
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.profiler = SamplingProfiler() if PROFILING_ENABLED else None
+
+    @staticmethod
+    def route_label(scope) -> str:
+        return getattr(scope.get("route"), "path", None) or "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        state = {"status": 500, "route": "pending"}
+        profile = self.profiler is not None and self.profiler.requested(scope)
+        if profile:
+            self.profiler.start()
+        HTTP_IN_FLIGHT.inc(method=method, route=state["route"])
+
+        def relabel():
+            if state["route"] == "pending" and scope.get("route") is not None:
+                HTTP_IN_FLIGHT.dec(method=method, route="pending")
+                state["route"] = self.route_label(scope)
+                HTTP_IN_FLIGHT.inc(method=method, route=state["route"])
+
+        async def receive_wrapper():
+            relabel()
+            return await receive()
+
+        async def send_wrapper(message):
+            relabel()
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                if profile:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-profile-file", self.profiler.path_for().encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec(method=method, route=state["route"])
+            route = self.route_label(scope)
+            HTTP_LATENCY.observe(elapsed, method=method, route=route)
+            HTTP_REQUESTS.inc(method=method, route=route, status=state["status"])
+            if profile:
+                self.profiler.stop()
+
+
+# ------------ Sampling profiler ---------------------------------------
+
+IDLE_LEAVES = {("selectors.py", "select"), ("threading.py", "wait"), ("queue.py", "get"),
+               ("threading.py", "_wait_for_tstate_lock"), ("thread.py", "_worker")}
+
+
+class SamplingProfiler:
+    """
+    Samples every thread's stack while a profiled request is running and writes
+    the counts as collapsed stacks. Async handlers share the event loop thread,
+    so concurrent requests can show up in each other's profiles.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL, out_dir: str = PROFILE_DIR):
+        self.interval = interval
+        self.out_dir = out_dir
+        self._lock = threading.Lock()
+        self._active = 0
+        self._counts: Dict[str, int] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._done: Optional[threading.Event] = None
+        self._stamp = ""
+
+    @staticmethod
+    def requested(scope) -> bool:
+        headers = dict(scope.get("headers") or [])
+        return headers.get(b"x-profile") == b"1" or b"profile=1" in scope.get("query_string", b"")
+
+    def path_for(self) -> str:
+        # One file per profiling session; overlapping profiled requests share it
+        return os.path.join(self.out_dir, f"{self._stamp}.folded")
+
+    def start(self):
+        with self._lock:
+            self._active += 1
+            if self._thread is None:
+                # Each session samples into its own dict until its own event is set, so a start()
+                # racing a stop() that is still joining begins a fresh session instead of resetting it
+                self._counts, self._done = {}, threading.Event()
+                self._stamp = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+                self._thread = threading.Thread(target=self._run, args=(self._counts, self._done),
+                                                name="sampling-profiler", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            self._active -= 1
+            if self._active > 0:
+                return
+            thread, self._thread = self._thread, None
+            counts, path = self._counts, self.path_for()
+            self._done.set()
+        thread.join()
+        os.makedirs(self.out_dir, exist_ok=True)
+        with open(path, "w") as f:
+            for stack, count in sorted(counts.items()):
+                f.write(f"{stack} {count}\n")
+
+    def _run(self, counts: Dict[str, int], done: threading.Event):
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        while not done.is_set():
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if tid not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack.append(names.get(tid, f"thread-{tid}"))
+                key = ";".join(reversed(stack))
+                counts[key] = counts.get(key, 0) + 1
+            done.wait(self.interval)
@@ -1,7 +1,5 @@
-import preferences2
-
 # normalize.py
-from typing import Union
+from typing import List, Union
 
 import re
 
@@ -13,6 +11,88 @@ DEFAULT_PREFERENCES = {
 
 STANDARD_KEYS = ["major", "minor", "courses_taken", "target_graduation", "preferences"]
 
+# ------------ Transcript / free-text extraction ---------------------------
+# Every pattern is compiled once here. TOKEN_RE is a single alternation that
+# normalize_text() walks across the whole document in one left-to-right scan.
+# Only the department code is case-sensitive: "COSC 1336" is a course, while
+# "work 2000" or "in 2025" are ordinary words before a number.
+
+TOKEN_RE = re.compile(r"""
+    (?P<grad>\bgraduat\w*\b[^\n]{0,40}?
+        (?P<grad_val>(?:Spring|Summer|Fall|Winter|May|August|December)\s+(?:19|20)\d{2}))
+  | (?P<term>\b(?P<season>Spring|Summer|Fall|Winter)\s+(?P<year>(?:19|20)\d{2})\b)
+  | (?P<course>\b(?P<dept>(?-i:[A-Z]{2,4}))[ \t]?(?P<num>\d{4})\b)
+  | (?P<field>\b(?P<kind>major|minor)(?:ing)?\b(?:\s*(?:is|in|:|-))*\s*
+        (?P<field_val>[A-Za-z&/ ]+?)(?=\s*(?:[,.;:()\n-]|\band\b|\bwith\b|$)))
+  | (?P<summer>\bsummer\s+(?:classes|courses|sessions?|terms?|semesters?)\b)
+  | (?P<wants>\b(?:want|plan|hope|need|would\s+like)\s+to\s+take\b)
+""", re.IGNORECASE | re.VERBOSE)
+
+# Rest of a transcript course line: "Data Structures   3.00   A-"
+COURSE_TAIL_RE = re.compile(
+    r"[ \t]+(?P<title>[^\n]*?)[ \t]+(?P<credits>\d{1,2}(?:\.\d{1,2})?)"
+    r"(?:[ \t]+(?P<grade>[A-F][+-]?|CR|NC|IP|P|W|I|S|U))?[ \t]*$",
+    re.MULTILINE,
+)
+
+NOT_PASSED = {"F", "W", "NC", "I", "IP", "U"}
+SENTENCE_END_RE = re.compile(r"[.!?\n]")
+NEGATIONS = ("no ", "not ", "n't ", "avoid", "without", "skip")
+
+
+def normalize_text(text: str) -> dict:
+    """
+    One linear scan of a transcript or free-text message into the STANDARD_KEYS schema.
+
+    courses_taken becomes a list of {"code", "title", "credits", "term", "grade"}
+    records (failed, withdrawn and incomplete courses are left out). A term
+    heading such as "Fall 2024" applies to the course lines that follow it.
+    """
+    normalized = {key: None for key in STANDARD_KEYS}
+    normalized["preferences"] = DEFAULT_PREFERENCES.copy()
+
+    courses = {}  # code -> record; a retake replaces the earlier attempt
+    current_term = None
+    wanted_until = -1  # courses before this offset follow "want to take" and are not taken yet
+    pos, end = 0, len(text)
+    while pos < end:
+        m = TOKEN_RE.search(text, pos)
+        if m is None:
+            break
+        pos = m.end()
+
+        if m.group("grad"):
+            normalized["target_graduation"] = m.group("grad_val").title()
+        elif m.group("term"):
+            current_term = f"{m.group('season').title()} {m.group('year')}"
+        elif m.group("course"):
+            if m.start() < wanted_until:
+                continue
+            record = {"code": f"{m.group('dept')} {m.group('num')}", "title": None,
+                      "credits": None, "term": current_term, "grade": None}
+            line_end = text.find("\n", pos)
+            tail = COURSE_TAIL_RE.match(text, pos, end if line_end < 0 else line_end)
+            if tail:
+                # Structured transcript line: the rest of the line is consumed here
+                record["title"] = tail.group("title").strip() or None
+                record["credits"] = float(tail.group("credits"))
+                record["grade"] = (tail.group("grade") or "").upper() or None
+                pos = tail.end()
+            courses[record["code"]] = record
+        elif m.group("field"):
+            normalized[m.group("kind").lower()] = m.group("field_val").strip().title()
+        elif m.group("summer"):
+            before = text[max(0, m.start() - 25):m.start()].lower()
+            normalized["preferences"]["wantsSummerClasses"] = not any(n in before for n in NEGATIONS)
+        elif m.group("wants"):
+            normalized["preferences"]["wantsSpecificCourses"] = True
+            stop = SENTENCE_END_RE.search(text, pos)
+            wanted_until = stop.start() if stop else end
+
+    normalized["courses_taken"] = [c for c in courses.values() if c["grade"] not in NOT_PASSED]
+    return normalized
+
+
 def normalize_student_input(student_input: Union[str, dict, None]) -> dict:
     """
     Standardize any student input (text or dict) to a consistent schema.
@@ -23,6 +103,9 @@ def normalize_student_input(student_input: Union[str, dict, None]) -> dict:
     Returns:
         dict: Normalized student data.
     """
+    if isinstance(student_input, str):
+        return normalize_text(student_input)
+
     normalized = {key: None for key in STANDARD_KEYS}
     normalized["preferences"] = DEFAULT_PREFERENCES.copy()
 
@@ -30,8 +113,10 @@ def normalize_student_input(student_input: Union[str, dict, None]) -> dict:
         for key in STANDARD_KEYS:
             if key in student_input:
                 normalized[key] = student_input[key]
-    elif isinstance(student_input, str):
-        # Put raw text in courses_taken if no other info available
-        normalized["courses_taken"] = student_input.strip()
 
     return normalized
+
+
+def normalize_many(documents: List[Union[str, dict, None]]) -> List[dict]:
+    """Batch helper; runs inside worker processes for /api/nlp/preferences/batch."""
+    return [normalize_student_input(doc) for doc in documents]
@@ -0,0 +1,200 @@
+# pdf_ingest.py
+"""
+PDF ingestion pipeline for /api/uploads/pdf.
+
+Uploads are streamed to disk in chunks while being hashed, and stored under
+their SHA-256 so two files with the same name never overwrite each other and
+an identical PDF is only ever parsed once. Text extraction runs as a
+background job in the shared process pool (workers.py), a batch of pages per
+task, so the event loop never blocks on PyMuPDF. Finished pages go to the
+on-disk pdf_text.PDFTextStore.
+
+Job records are kept for polling only: a finished (done or error) job is
+forgotten after PDF_JOB_TTL seconds, or sooner, oldest first, once more than
+PDF_MAX_JOBS are kept. Queued and running jobs are never dropped. The
+extracted text stays in the store, so re-uploading the same PDF later still
+skips extraction.
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+import metrics
+import workers
+from pdf_text import PDFTextStore
+
+CHUNK_SIZE = 1024 * 1024  # bytes read from the upload per await
+PAGES_PER_TASK = 8  # pages handed to a worker per pool task
+MAX_JOBS = int(os.getenv("PDF_MAX_JOBS", 1000))  # job records kept for polling
+JOB_TTL = float(os.getenv("PDF_JOB_TTL", 60 * 60))  # seconds a finished job stays pollable
+
+# job id -> {"status": queued|running|done|error, "id", "filename", "sha256", "pages", "pages_done", ...},
+# oldest first
+jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+# sha256 -> job id, for deduplicating identical uploads
+jobs_by_hash: Dict[str, str] = {}
+
+_tasks = set()  # strong refs so running jobs are not garbage-collected
+
+
+# ------------ Worker-side helpers (run inside the process pool) -------
+
+def pdf_page_count(file_path: str) -> int:
+    import fitz  # PyMuPDF
+
+    with fitz.open(file_path) as doc:
+        return doc.page_count
+
+
+def extract_pdf_pages(file_path: str, start: int = 0, stop: Optional[int] = None) -> List[Tuple[str, float]]:
+    """(text, seconds to extract it) for pages [start, stop), timed in the worker itself."""
+    import fitz  # PyMuPDF
+
+    pages = []
+    with fitz.open(file_path) as doc:
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        for i in range(start, stop):
+            t0 = time.perf_counter()
+            text = doc.load_page(i).get_text("text")
+            pages.append((text, time.perf_counter() - t0))
+    return pages
+
+
+# ------------ Upload + jobs -------------------------------------------
+
+async def save_upload(file, upload_dir: str) -> Dict[str, Any]:
+    """
+    Stream an UploadFile to `upload_dir` in CHUNK_SIZE pieces, hashing as it goes.
+    The file ends up at <upload_dir>/<sha256>.pdf.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    tmp_path = os.path.join(upload_dir, f".upload-{uuid4().hex}.part")
+    try:
+        with open(tmp_path, "wb") as f:
+            while True:
+                chunk = await file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+        sha = digest.hexdigest()
+        path = os.path.join(upload_dir, f"{sha}.pdf")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {"path": path, "sha256": sha, "bytes": size}
+
+
+def public_job(job_id: str) -> Dict[str, Any]:
+    job = jobs[job_id]
+    return {"jobId": job_id, **{k: v for k, v in job.items() if k not in ("path", "finished")}}
+
+
+def _prune_jobs():
+    """Forget finished jobs past JOB_TTL, then the oldest finished ones while over MAX_JOBS."""
+    now = time.time()
+    finished = [job_id for job_id, job in jobs.items() if job.get("finished") is not None]
+    excess = len(jobs) - MAX_JOBS
+    for job_id in finished:
+        if jobs[job_id]["finished"] + JOB_TTL > now and excess <= 0:
+            continue
+        job = jobs.pop(job_id)
+        excess -= 1
+        if jobs_by_hash.get(job["sha256"]) == job_id:
+            del jobs_by_hash[job["sha256"]]
+
+
+def start_job(saved: Dict[str, Any], filename: str, pdf_store: PDFTextStore) -> Dict[str, Any]:
+    """
+    Queue extraction for a saved upload, or return the existing job when the same
+    content was uploaded before. Extracted pages land in pdf_store under the job's "id".
+    """
+    existing = jobs_by_hash.get(saved["sha256"])
+    if existing is not None and jobs[existing]["status"] != "error":
+        return {**public_job(existing), "deduplicated": True}
+
+    job_id = str(uuid4())
+    stored = pdf_store.find_sha(saved["sha256"])
+    if stored is not None:
+        # Extracted by an earlier process (or another worker): no job ran here, so record a finished one
+        jobs[job_id] = {
+            "status": "done",
+            "id": stored["id"],
+            "filename": filename,
+            "sha256": saved["sha256"],
+            "bytes": saved["bytes"],
+            "path": saved["path"],
+            "pages": stored["pages"],
+            "pages_done": stored["pages"],
+            "chars": stored["chars"],
+            "error": None,
+            "finished": time.time(),
+        }
+        jobs_by_hash[saved["sha256"]] = job_id
+        _prune_jobs()
+        return {**public_job(job_id), "deduplicated": True}
+
+    jobs[job_id] = {
+        "status": "queued",
+        "id": str(uuid4()),
+        "filename": filename,
+        "sha256": saved["sha256"],
+        "bytes": saved["bytes"],
+        "path": saved["path"],
+        "pages": None,
+        "pages_done": 0,
+        "chars": None,
+        "error": None,
+        "finished": None,
+    }
+    jobs_by_hash[saved["sha256"]] = job_id
+    _prune_jobs()
+    task = asyncio.get_running_loop().create_task(_run_job(job_id, pdf_store))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return {**public_job(job_id), "deduplicated": False}
+
+
+async def _run_job(job_id: str, pdf_store: PDFTextStore):
+    job = jobs[job_id]
+    loop = asyncio.get_running_loop()
+    pool = workers.get_pool()
+    try:
+        job["status"] = "running"
+        pages = await loop.run_in_executor(pool, pdf_page_count, job["path"])
+        job["pages"] = pages
+
+        async def run_batch(start: int) -> List[str]:
+            pages = await loop.run_in_executor(pool, extract_pdf_pages, job["path"], start, start + PAGES_PER_TASK)
+            for _, seconds in pages:
+                metrics.PDF_PAGE_SECONDS.observe(seconds)
+            job["pages_done"] += len(pages)
+            return [text for text, _ in pages]
+
+        batches = await asyncio.gather(*(run_batch(s) for s in range(0, pages, PAGES_PER_TASK)))
+        texts = [t for batch in batches for t in batch]
+
+        # Compressing and indexing is blocking file/SQLite work; keep it off the event loop
+        stored = await loop.run_in_executor(None, pdf_store.add, job["id"], job["filename"], job["sha256"], texts)
+        job["chars"] = stored["chars"]
+        job["status"] = "done"
+    except BrokenProcessPool:
+        # A worker died (e.g. a malformed PDF crashed PyMuPDF); start a fresh pool next time
+        workers.discard_pool(pool)
+        job["status"] = "error"
+        job["error"] = "PDF worker crashed during extraction."
+    except Exception as e:
+        print(f"PDF extraction failed for {job['filename']}: {e}")
+        job["status"] = "error"
+        job["error"] = str(e)
+    finally:
+        job["finished"] = time.time()
@@ -0,0 +1,262 @@
+# pdf_text.py
+"""
+On-disk store for text extracted from uploaded PDFs (transcripts, catalogs).
+
+Replaces the old in-memory memory_db["pdf_store"] dict, which kept the full
+text of every upload in RAM forever:
+
+- each page is zlib-compressed and appended to one data file, read back
+  through mmap, so only the pages actually asked for are decompressed;
+- a bounded LRU (PDF_CACHE_CHARS characters) keeps recently read pages in
+  memory;
+- document metadata, page offsets and an inverted index of course codes
+  ("COSC 1437") and academic terms ("Fall 2024") live in SQLite (WAL), so
+  every uvicorn worker sees every upload, and uploads survive restarts.
+
+snippets() answers "what do these PDFs say about these courses" with short
+excerpts around indexed hits, capped at a character budget, so a prompt that
+references uploads stays the same size however large or many they are.
+"""
+
+import mmap
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from catalog import COURSE_CODE_RE, normalize_code
+
+try:
+    import fcntl  # serializes appends across worker processes (POSIX only)
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+DEFAULT_PATH = os.getenv("PDF_STORE_PATH", os.path.join(os.getcwd(), "pdf_text"))  # .sqlite3 + .bin
+CACHE_CHARS = int(os.getenv("PDF_CACHE_CHARS", 4_000_000))  # decompressed page text kept in memory
+SNIPPET_CHARS = int(os.getenv("PDF_SNIPPET_CHARS", 240))  # longest single excerpt
+SNIPPET_BUDGET = int(os.getenv("PDF_SNIPPET_BUDGET", 2000))  # total excerpt characters per request
+COMPRESS_LEVEL = 6
+
+TERM_RE = re.compile(r"\b(spring|summer|fall|winter)\s+((?:19|20)\d{2})\b", re.IGNORECASE)
+SEASON_WORDS = {"FALL"}  # "FALL 2024" in an upper-case transcript is a term, not a course
+
+
+def index_keys(text: str) -> Dict[str, Tuple[int, int]]:
+    """Indexed keys in one page of text: key -> (first position, occurrences)."""
+    keys: Dict[str, Tuple[int, int]] = {}
+
+    def add(key: str, pos: int):
+        first, count = keys.get(key, (pos, 0))
+        keys[key] = (first, count + 1)
+
+    for m in COURSE_CODE_RE.finditer(text):
+        if m.group(1) not in SEASON_WORDS:
+            add(f"{m.group(1)} {m.group(2)}", m.start())
+    for m in TERM_RE.finditer(text):
+        add(f"{m.group(1).capitalize()} {m.group(2)}", m.start())
+    return keys
+
+
+def normalize_key(key: str) -> str:
+    """"cosc1437" -> "COSC 1437", "fall 2024" -> "Fall 2024"."""
+    m = TERM_RE.fullmatch(key.strip())
+    if m:
+        return f"{m.group(1).capitalize()} {m.group(2)}"
+    m = COURSE_CODE_RE.fullmatch(key.strip().upper())
+    return f"{m.group(1)} {m.group(2)}" if m else normalize_code(key)
+
+
+class PDFTextStore:
+    def __init__(self, path: str = DEFAULT_PATH, cache_chars: int = CACHE_CHARS):
+        self.db_path = path + ".sqlite3"
+        self.data_path = path + ".bin"
+        self.cache_chars = cache_chars
+        self._local = threading.local()
+        self._lock = threading.Lock()  # guards the mmap, the page cache and appends
+        self._map: Optional[mmap.mmap] = None
+        self._map_size = 0
+        self._cache: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+        self._cached_chars = 0
+        open(self.data_path, "ab").close()
+        with self._conn() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, filename TEXT NOT NULL, "
+                "sha256 TEXT NOT NULL, pages INTEGER NOT NULL, chars INTEGER NOT NULL, created REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS idx_docs_sha ON docs (sha256)")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS pages (doc_id TEXT NOT NULL, page INTEGER NOT NULL, "
+                "offset INTEGER NOT NULL, length INTEGER NOT NULL, chars INTEGER NOT NULL, "
+                "PRIMARY KEY (doc_id, page)) WITHOUT ROWID"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS postings (key TEXT NOT NULL, doc_id TEXT NOT NULL, "
+                "page INTEGER NOT NULL, pos INTEGER NOT NULL, count INTEGER NOT NULL, "
+                "PRIMARY KEY (key, doc_id, page)) WITHOUT ROWID"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread, as in storage.SQLiteCourseStore
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    # ------------ Writing ----------------------------------------------
+
+    def add(self, doc_id: str, filename: str, sha256: str, pages: List[str]) -> Dict[str, Any]:
+        """Store one document's page texts and index them. Returns its metadata."""
+        blobs = [zlib.compress(p.encode("utf-8"), COMPRESS_LEVEL) for p in pages]
+        with self._lock, open(self.data_path, "ab") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            offset = f.seek(0, os.SEEK_END)
+            f.write(b"".join(blobs))
+            f.flush()  # the lock is released on close
+
+        page_rows, postings = [], []
+        for i, (text, blob) in enumerate(zip(pages, blobs)):
+            page_rows.append((doc_id, i, offset, len(blob), len(text)))
+            offset += len(blob)
+            postings.extend((key, doc_id, i, pos, n) for key, (pos, n) in index_keys(text).items())
+        meta = {"id": doc_id, "filename": filename, "sha256": sha256,
+                "pages": len(pages), "chars": sum(len(p) for p in pages)}
+        with self._conn() as db:
+            db.execute("INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?, ?, ?)",
+                       (doc_id, filename, sha256, meta["pages"], meta["chars"], time.time()))
+            db.execute("DELETE FROM pages WHERE doc_id = ?", (doc_id,))
+            db.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+            db.executemany("INSERT INTO pages VALUES (?, ?, ?, ?, ?)", page_rows)
+            db.executemany("INSERT INTO postings VALUES (?, ?, ?, ?, ?)", postings)
+        return meta
+
+    # ------------ Reading ----------------------------------------------
+
+    def __contains__(self, doc_id: str) -> bool:
+        return self._conn().execute("SELECT 1 FROM docs WHERE id = ?", (doc_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT id, filename, sha256, pages, chars FROM docs WHERE id = ?", (doc_id,)
+        ).fetchone()
+        return dict(zip(("id", "filename", "sha256", "pages", "chars"), row)) if row else None
+
+    def find_sha(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """An already stored document with this content hash, if any."""
+        row = self._conn().execute("SELECT id FROM docs WHERE sha256 = ? LIMIT 1", (sha256,)).fetchone()
+        return self.get(row[0]) if row else None
+
+    def _read(self, offset: int, length: int) -> str:
+        with self._lock:
+            if offset + length > self._map_size:
+                # The data file only grows; map it again to see newer appends
+                with open(self.data_path, "rb") as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._map_size = len(self._map)
+            blob = self._map[offset:offset + length]
+        return zlib.decompress(blob).decode("utf-8")
+
+    def page(self, doc_id: str, page: int) -> str:
+        """One page's text, through the LRU of hot pages."""
+        key = (doc_id, page)
+        with self._lock:
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+                return text
+        row = self._conn().execute(
+            "SELECT offset, length FROM pages WHERE doc_id = ? AND page = ?", (doc_id, page)
+        ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        text = self._read(*row)
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = text
+                self._cached_chars += len(text)
+            while self._cached_chars > self.cache_chars and self._cache:
+                _, old = self._cache.popitem(last=False)
+                self._cached_chars -= len(old)
+        return text
+
+    def text(self, doc_id: str) -> str:
+        """A whole document's text. Read straight from disk so it does not flush the page cache."""
+        rows = self._conn().execute(
+            "SELECT offset, length FROM pages WHERE doc_id = ? ORDER BY page", (doc_id,)
+        ).fetchall()
+        if not rows and doc_id not in self:
+            raise KeyError(doc_id)
+        return "".join(self._read(offset, length) for offset, length in rows)
+
+    def lookup(self, keys: Iterable[str], doc_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Index hits for `keys` within `doc_ids`, in key order then document order."""
+        doc_ids = list(doc_ids)
+        marks = ", ".join("?" * len(doc_ids))
+        order = {d: i for i, d in enumerate(doc_ids)}
+        hits = []
+        for key in keys:
+            rows = self._conn().execute(
+                f"SELECT doc_id, page, pos, count FROM postings WHERE key = ? AND doc_id IN ({marks})",
+                [key, *doc_ids],
+            ).fetchall()
+            rows.sort(key=lambda r: (order[r[0]], r[1]))
+            hits.extend({"key": key, "pdfId": d, "page": p, "pos": pos, "count": n} for d, p, pos, n in rows)
+        return hits
+
+    def snippets(self, doc_ids: Iterable[str], keys: Iterable[str],
+                 budget: int = SNIPPET_BUDGET) -> List[Dict[str, Any]]:
+        """
+        Excerpts of `doc_ids` around the first mention of each key on a page,
+        in key priority order, until `budget` characters are used. Excerpts
+        that overlap on a page are merged.
+        """
+        keys = list(dict.fromkeys(normalize_key(k) for k in keys))
+        spans: Dict[Tuple[str, int], List[list]] = {}  # (doc, page) -> [[start, end, keys]]
+        out: List[Dict[str, Any]] = []
+        used = 0
+        for hit in self.lookup(keys, doc_ids):
+            if used >= budget:
+                break
+            doc_page = (hit["pdfId"], hit["page"])
+            text = self.page(*doc_page)
+            # Up to a quarter of the window before the hit, the rest after, cut at line breaks
+            pos = hit["pos"]
+            lo, hi = max(pos - SNIPPET_CHARS // 4, 0), min(pos + SNIPPET_CHARS * 3 // 4, len(text))
+            start = 0 if lo == 0 else text.find("\n", lo - 1, pos) + 1 or lo
+            end = text.rfind("\n", pos, hi)
+            end = hi if end < 0 else end
+            merged = next((s for s in spans.get(doc_page, ()) if start <= s[1] and end >= s[0]), None)
+            if merged is not None:
+                merged[2].append(hit["key"])
+                continue
+            end = min(end, start + budget - used)
+            span = [start, end, [hit["key"]]]
+            spans.setdefault(doc_page, []).append(span)
+            out.append({"pdfId": hit["pdfId"], "page": hit["page"] + 1, "keys": span[2],
+                        "text": " ".join(text[start:end].split())})
+            used += end - start
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        docs, chars = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(chars), 0) FROM docs").fetchone()
+        with self._lock:
+            cached_pages, cached_chars = len(self._cache), self._cached_chars
+        return {"documents": docs, "chars": chars, "disk_bytes": os.path.getsize(self.data_path),
+                "cached_pages": cached_pages, "cached_chars": cached_chars}
+
+
+def open_pdf_store() -> PDFTextStore:
+    return PDFTextStore()
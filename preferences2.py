@@ -1,58 +1,117 @@
 # preferences2.py
 """
 NLP routes for extracting/normalizing student preferences.
-Exposes an APIRouter you can include from main.py:
+Exposes the APIRouter that main.py includes (once):
 
     from preferences2 import router as nlp_router
     app.include_router(nlp_router)
+
+The batch route reads extracted uploads from app.state.pdf_store, which
+main.py sets to its PDF text store. With a chatSessionId, /preferences also
+records the message in app.state.sessions (sessions.SessionStore) and merges
+its normalized schema into the session's.
 """
 
-from typing import Optional
+import asyncio
+import time
+from typing import List, Optional
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 
-# If you already have normalize_student_input in normalize.py, we'll use it.
-# If import fails, we fall back to a safe stub.
-try:
-    from normalize import normalize_student_input  # your existing helper
-except Exception:
-    def normalize_student_input(student_input):
-        # Minimal schema that the frontend can consume safely
-        return {
-            "major": None,
-            "minor": None,
-            "courses_taken": (student_input or None),
-            "target_graduation": None,
-            "preferences": {
-                "wantsSummerClasses": False,
-                "wantsSpecificCourses": False,
-            },
-        }
+import workers
+from normalize import normalize_student_input, normalize_many
 
 router = APIRouter(prefix="/api/nlp", tags=["nlp"])
 
+NLP_BATCH_CHUNK = 64  # documents per worker task; smaller batches stay in-process
+
 
 class PrefsRequest(BaseModel):
     """
     Request body for /api/nlp/preferences
     """
     text: Optional[str] = None
+    chatSessionId: Optional[str] = None
+
+
+class PrefsBatchRequest(BaseModel):
+    """
+    Request body for /api/nlp/preferences/batch
+    """
+    documents: List[Optional[str]] = []
+    pdfIds: List[str] = []  # extracted uploads to normalize alongside the raw documents
 
 
 @router.post("/preferences")
-def extract_preferences(body: PrefsRequest):
+def extract_preferences(body: PrefsRequest, request: Request):
     """
-    Normalize free-text (or later, LLM output) into a stable JSON shape:
+    Normalize free-text (or later, LLM output) into a stable JSON shape under
+    "normalized_schema":
     {
       "major": str|None,
       "minor": str|None,
-      "courses_taken": str|None,
+      "courses_taken": [{"code", "title", "credits", "term", "grade"}]|None,
       "target_graduation": str|None,
       "preferences": {
         "wantsSummerClasses": bool,
         "wantsSpecificCourses": bool
       }
     }
+    With a chatSessionId the response also has "session": the schema merged
+    across the session's messages so far, and its turn counts.
+    """
+    normalized_data = normalize_student_input(body.text)
+
+    # 🚨 This is where you would call the LLM to extract major/graduation date from text
+
+    response = {
+        "message": "Data normalized successfully (LLM extraction step skipped for now)",
+        "input": body.text,
+        "normalized_schema": normalized_data,
+    }
+    if body.chatSessionId:
+        sessions = request.app.state.sessions
+        if body.text:
+            sessions.add_turn(body.chatSessionId, "user", body.text)
+        merged = sessions.merge_schema(body.chatSessionId, normalized_data)
+        session = sessions.get(body.chatSessionId)
+        response["session"] = {
+            "chatSessionId": body.chatSessionId,
+            "normalized_schema": merged,
+            "turns": len(session.turns),
+            "compacted_turns": session.compacted,
+        }
+    return response
+
+
+@router.post("/preferences/batch")
+async def extract_preferences_batch(body: PrefsBatchRequest, request: Request):
     """
-    return normalize_student_input(body.text)
+    Normalizes many documents per request. Results come back in input order:
+    body.documents first, then body.pdfIds. Large batches are split into
+    NLP_BATCH_CHUNK-sized tasks across the shared worker pool.
+    """
+    pdf_store = request.app.state.pdf_store
+    documents = list(body.documents)
+    try:
+        # Whole-document reads hit SQLite and decompress every page; keep them off the event loop
+        documents += await asyncio.to_thread(lambda: [pdf_store.text(pdf_id) for pdf_id in body.pdfIds])
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"PDF not found: {e.args[0]}")
+
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    if len(documents) <= NLP_BATCH_CHUNK:
+        results = await loop.run_in_executor(None, normalize_many, documents)
+    else:
+        pool = workers.get_pool()
+        chunks = [documents[i:i + NLP_BATCH_CHUNK] for i in range(0, len(documents), NLP_BATCH_CHUNK)]
+        parts = await asyncio.gather(*(loop.run_in_executor(pool, normalize_many, c) for c in chunks))
+        results = [r for part in parts for r in part]
+
+    return {
+        "count": len(results),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        "results": results,
+    }
@@ -0,0 +1,197 @@
+# prompts.py
+"""
+Compact, token-budgeted prompts for the schedule LLM call.
+
+Instead of inlining `[c.dict() for c in courses]` as a Python repr (and then
+repeating the codes), the request is encoded as minified JSON:
+
+- completed courses collapse to their codes,
+- planned courses become rows under a shared column header,
+- prefs are factored into a small table that rows point at (or dropped
+  entirely when they are all the default),
+- the solver draft is one [code, days, time] row per course, grouped by term,
+- uploaded PDFs (pdfIds) contribute only short excerpts around mentions of
+  the request's courses (pdf_text.PDFTextStore.snippets), never whole files,
+- a chat session contributes its bounded context (sessions.Session.context):
+  a compacted summary, the last few turns and the student's stated facts.
+
+Prompts over the token budget are split into term-sized sub-requests that
+can run concurrently; merge_responses() stitches the JSON answers back.
+"""
+
+import json
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+from catalog import normalize_code
+
+PROMPT_VERSION = "schedule-v5"  # bump whenever the prompt changes so stale cache entries miss
+TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", 6000))  # input tokens per LLM request
+
+PLANNED_COLUMNS = ["code", "title", "credits", "term", "prefs"]
+DEFAULT_PREFS = {"days": [], "timeOfDay": "Any", "modality": "Any"}
+
+SYSTEM_PROMPT = (
+    "You are an AI academic scheduling assistant. The user message is JSON describing one student: "
+    "'completed' lists course codes already taken; 'planned' rows follow 'columns'; a row's 'prefs' "
+    "value is a key into 'prefs' (days, timeOfDay, modality; absent means no preference); 'draft' is a "
+    "constraint solver's schedule (term -> [code, days, time] rows) that already respects prerequisites, "
+    "credit limits and preferences; 'unscheduled' are courses the solver could not place; 'excerpts' "
+    "(optional) are [document, page, text] quotes from the student's uploaded transcripts or catalogs "
+    "that mention these courses; 'session' (optional) is the conversation so far ('summary' of older "
+    "turns, 'recent' [role, text] turns, 'student' facts such as major and target graduation). "
+    "Keep the draft's terms unless there is a strong reason to change them. "
+    "Respond with a JSON object with keys 'planned_schedule' (a list of objects with 'code' and "
+    "'suggested_term', e.g. 'Fall 2025') and 'reasoning' (a short explanation of the choices)."
+)
+
+# ------------ Token counting (tiktoken is optional) --------------------
+
+_encoding = None  # tiktoken encoding, loaded on first count (False when unavailable)
+
+
+def count_tokens(text: str) -> int:
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    # ~4 characters per token for English/JSON; close enough for budgeting
+    return math.ceil(len(text) / 4)
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+# ------------ Encoding -------------------------------------------------
+
+def encode_request(courses: List[dict], result: dict, excerpts: Optional[List[dict]] = None,
+                   session: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Compact payload for a schedule request, its solver result, any PDF excerpts and chat context."""
+    completed, planned, seen = [], [], set()
+    prefs_table: Dict[str, str] = {}  # serialized prefs -> key
+    prefs_values: Dict[str, dict] = {}
+    for c in courses:
+        code = normalize_code(c["code"])
+        if code in seen:
+            continue
+        seen.add(code)
+        if c.get("status") == "completed":
+            completed.append(code)
+            continue
+        prefs = {k: v for k, v in (c.get("prefs") or {}).items() if v != DEFAULT_PREFS.get(k)}
+        ref = None
+        if prefs:
+            blob = _dumps(prefs)
+            if blob not in prefs_table:
+                prefs_table[blob] = f"P{len(prefs_table)}"
+                prefs_values[prefs_table[blob]] = prefs
+            ref = prefs_table[blob]
+        planned.append([code, c.get("title"), c.get("credits"), c.get("term"), ref])
+
+    draft: Dict[str, List[list]] = {}
+    for entry in result["planned_schedule"]:
+        draft.setdefault(entry["suggested_term"], []).append(
+            [entry["code"], "".join(d[:2] for d in entry["days"]), entry["time"]]
+        )
+
+    payload: Dict[str, Any] = {"completed": completed, "columns": PLANNED_COLUMNS, "planned": planned}
+    if prefs_values:
+        payload["prefs"] = prefs_values
+    else:
+        payload["columns"] = PLANNED_COLUMNS[:-1]
+        payload["planned"] = [row[:-1] for row in planned]
+    payload["draft"] = draft
+    if result["unscheduled"]:
+        payload["unscheduled"] = [f"{u['code']}: {u['reason']}" for u in result["unscheduled"]]
+    if excerpts:
+        documents: Dict[str, int] = {}  # pdfId -> 1-based number, so ids are not repeated per row
+        payload["excerpts"] = [[documents.setdefault(e["pdfId"], len(documents) + 1), e["page"], e["text"]]
+                               for e in excerpts]
+    if session:
+        payload["session"] = session
+    return payload
+
+
+def build_messages(payload: Dict[str, Any]) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": _dumps(payload)},
+    ]
+
+
+def message_tokens(messages: List[Dict[str, str]]) -> int:
+    # +4 per message for the chat format's role/separator overhead
+    return sum(count_tokens(m["content"]) + 4 for m in messages)
+
+
+# ------------ Splitting / merging --------------------------------------
+
+def _sub_payload(payload: Dict[str, Any], terms: List[str], earlier: List[str], last: bool) -> Dict[str, Any]:
+    """Payload restricted to `terms`; courses from earlier chunks count as completed by then."""
+    codes = {row[0] for t in terms for row in payload["draft"][t]}
+    placed = {row[0] for rows in payload["draft"].values() for row in rows}
+    # Courses the solver could not place ride along with the last chunk
+    rows = [r for r in payload["planned"] if r[0] in codes or (last and r[0] not in placed)]
+    sub = dict(payload)
+    sub["completed"] = payload["completed"] + earlier
+    sub["planned"] = rows
+    sub["draft"] = {t: payload["draft"][t] for t in terms}
+    if "prefs" in payload:
+        used = {r[-1] for r in rows}
+        sub["prefs"] = {k: v for k, v in payload["prefs"].items() if k in used}
+    if not last:
+        sub.pop("unscheduled", None)
+    return sub
+
+
+def split_payload(payload: Dict[str, Any], budget: int = TOKEN_BUDGET) -> List[Dict[str, Any]]:
+    """
+    The payload itself when it fits the budget; otherwise consecutive groups of
+    draft terms, each as large as still fits. A single term that is over budget
+    on its own is sent as is.
+    """
+    if message_tokens(build_messages(payload)) <= budget or len(payload["draft"]) <= 1:
+        return [payload]
+
+    terms = list(payload["draft"])
+    chunks: List[Dict[str, Any]] = []
+    group: List[str] = []
+    earlier: List[str] = []
+    for term in terms:
+        candidate = _sub_payload(payload, group + [term], earlier, term == terms[-1])
+        if group and message_tokens(build_messages(candidate)) > budget:
+            chunks.append(_sub_payload(payload, group, earlier, False))
+            earlier = earlier + [row[0] for t in group for row in payload["draft"][t]]
+            group = [term]
+        else:
+            group.append(term)
+    chunks.append(_sub_payload(payload, group, earlier, True))
+    return chunks
+
+
+def parse_response(content: str) -> Dict[str, Any]:
+    """JSON object from a completion; raises ValueError when the model did not return one."""
+    data = json.loads(content or "")
+    if not isinstance(data, dict):
+        raise ValueError("LLM response is not a JSON object.")
+    data.setdefault("planned_schedule", [])
+    data.setdefault("reasoning", "")
+    return data
+
+
+def merge_responses(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Concatenate the sub-request answers in term order."""
+    if len(parts) == 1:
+        return parts[0]
+    return {
+        "planned_schedule": [entry for p in parts for entry in p.get("planned_schedule", [])],
+        "reasoning": " ".join(p.get("reasoning", "") for p in parts if p.get("reasoning")),
+    }
@@ -0,0 +1,287 @@
+# replan.py
+"""
+Incremental replanning for PATCH /api/schedule.
+
+The last solver plan for each student is kept as a PlanState (courses,
+rules and every course's term and meeting pattern). A change is replanned
+without rerunning the solver:
+
+- the changed courses are those created, deleted, or whose credits, term,
+  status or prefs changed;
+- the affected set is those courses plus everything downstream of them in
+  the prerequisite graph. Nothing else can be invalidated: an unaffected
+  course has no affected prerequisite, so its placement stays legal once
+  the affected courses' credits and slots are released;
+- affected courses are placed again in prerequisite order. Each keeps its
+  old term and meeting time when that is still legal, and otherwise goes to
+  the first term from its earliest legal one with credit room and a free
+  pattern.
+
+Courses outside the affected set never move, so a plan is stable under
+small edits (a full rebuild might pull later courses into freed space).
+When most of the plan is affected, replan() falls back to solver.solve.
+"""
+
+import heapq
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import solver
+from validation import find_prerequisites
+
+PLAN_STORE_MAX = int(os.getenv("REPLAN_MAX_PLANS", 1000))  # plans kept for PATCH /api/schedule
+FULL_REBUILD_FRACTION = float(os.getenv("REPLAN_FULL_REBUILD_FRACTION", 0.5))
+SUMMER = solver.SEASONS.index("Summer")
+COURSE_FIELDS = ("code", "credits", "term", "status", "prefs")  # fields that can change a placement
+
+
+class PlanState:
+    """A student's course list, the rules it was solved with, and where each course landed."""
+
+    def __init__(self, courses: List[dict], max_credits: int, include_summer: bool, start_term: Optional[str]):
+        self.courses = courses
+        self.max_credits = max_credits
+        self.include_summer = include_summer
+        self.start_term = start_term
+        self.term: Dict[str, int] = {}  # code -> term index
+        self.pattern: Dict[str, tuple] = {}  # code -> (mask, days, block)
+        self.unscheduled: Dict[str, str] = {}  # code -> reason
+        self.warnings: List[str] = []
+
+    @classmethod
+    def from_result(cls, courses: List[dict], result: dict, max_credits: int = solver.DEFAULT_MAX_CREDITS,
+                    include_summer: bool = False, start_term: Optional[str] = None) -> "PlanState":
+        """State for a solver.solve() result (as returned by /api/schedule/build)."""
+        state = cls(courses, max_credits, include_summer, start_term)
+        for entry in result["planned_schedule"]:
+            days = tuple(solver.normalize_days(entry["days"]))
+            block = [f"{s}-{e}" for s, e in solver.BLOCK_TIMES].index(entry["time"])
+            mask = 0
+            for d in days:
+                mask |= 1 << (d * solver.SLOTS_PER_DAY + block)
+            state.term[entry["code"]] = solver.term_index(entry["suggested_term"])
+            state.pattern[entry["code"]] = (mask, days, block)
+        state.unscheduled = {u["code"]: u["reason"] for u in result["unscheduled"]}
+        state.warnings = list(result["warnings"])
+        return state
+
+    def to_dict(self) -> dict:
+        """JSON-safe form (sessions.py spills plans to disk with it)."""
+        return {
+            "courses": self.courses, "max_credits": self.max_credits, "include_summer": self.include_summer,
+            "start_term": self.start_term, "term": self.term,
+            "pattern": {code: [mask, list(days), block] for code, (mask, days, block) in self.pattern.items()},
+            "unscheduled": self.unscheduled, "warnings": self.warnings,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PlanState":
+        state = cls(data["courses"], data["max_credits"], data["include_summer"], data["start_term"])
+        state.term = dict(data["term"])
+        state.pattern = {code: (mask, tuple(days), block) for code, (mask, days, block) in data["pattern"].items()}
+        state.unscheduled = dict(data["unscheduled"])
+        state.warnings = list(data["warnings"])
+        return state
+
+    def result(self, stats: dict) -> dict:
+        """The state in solver.solve()'s result shape."""
+        _, planned, _ = solver.split_courses(self.courses)
+        credits = {code: int(planned[code].get("credits") or 0) for code in self.term}
+        order = sorted(self.term, key=lambda c: (self.term[c], c))
+        by_term: Dict[int, List[str]] = {}
+        for code in order:
+            by_term.setdefault(self.term[code], []).append(code)
+        return {
+            "planned_schedule": [solver.schedule_entry(c, planned[c], credits[c], self.term[c], self.pattern[c])
+                                 for c in order],
+            "terms": solver.term_summaries(by_term, credits),
+            "unscheduled": [{"code": c, "reason": r} for c, r in self.unscheduled.items()],
+            "warnings": self.warnings,
+            "stats": stats,
+        }
+
+
+def apply_changes(courses: List[dict], create: List[dict], update: List[Tuple[str, dict]],
+                  delete: List[str]) -> List[dict]:
+    """
+    New course list after a bulk change (same semantics as storage bulk); KeyError
+    on an unknown id. Untouched courses are the same dict objects as before.
+    """
+    by_id = {c["id"]: c for c in courses}
+    for course_id, patch in update:
+        if course_id not in by_id:
+            raise KeyError(course_id)
+        by_id[course_id] = {**by_id[course_id], **patch}
+    for course_id in delete:
+        if course_id not in by_id:
+            raise KeyError(course_id)
+        del by_id[course_id]
+    for c in create:
+        by_id[c["id"]] = dict(c)
+    return list(by_id.values())
+
+
+def _same(a: Optional[dict], b: Optional[dict]) -> bool:
+    if a is b:
+        return True
+    return a is not None and b is not None and all(a.get(f) == b.get(f) for f in COURSE_FIELDS)
+
+
+def replan(state: PlanState, courses: List[dict],
+           prereq_fn: Callable[[str], list] = find_prerequisites) -> Tuple[PlanState, dict]:
+    """
+    Replan `state` for the new course list. Returns (new state, stats); stats
+    has mode ("incremental" or "full"), changed, affected and elapsed_ms.
+    """
+    started = time.perf_counter()
+    old_completed, old_planned, _ = solver.split_courses(state.courses)
+    completed, planned, warnings = solver.split_courses(courses)
+
+    changed = {code for code in old_planned.keys() | planned.keys()
+               if not _same(old_planned.get(code), planned.get(code))}
+    changed |= old_completed ^ completed
+
+    # Everything downstream of a change (edges follow prereq_fn, so a deleted course still reaches its dependents)
+    children: Dict[str, List[str]] = {}
+    parents: Dict[str, List[str]] = {}
+    for code in planned:
+        parents[code] = []
+        for p in prereq_fn(code):
+            p = solver.normalize_code(p)
+            children.setdefault(p, []).append(code)
+            if p in planned:
+                parents[code].append(p)
+            elif p not in completed:
+                warnings.append(f"{code} requires {p}, which is neither completed nor planned.")
+    affected, stack = set(), [c for c in changed]
+    while stack:
+        code = stack.pop()
+        if code in affected:
+            continue
+        affected.add(code)
+        stack.extend(children.get(code, ()))
+    affected &= set(planned)
+
+    def stats(mode: str) -> dict:
+        return {"mode": mode, "courses": len(planned), "changed": len(changed), "affected": len(affected),
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)}
+
+    new = PlanState(courses, state.max_credits, state.include_summer, state.start_term)
+    if len(affected) > FULL_REBUILD_FRACTION * max(len(planned), 1):
+        result = solver.solve(courses, state.max_credits, state.include_summer, state.start_term, prereq_fn)
+        new = PlanState.from_result(courses, result, state.max_credits, state.include_summer, state.start_term)
+        return new, stats("full")
+
+    new.warnings = warnings
+    load: Dict[int, int] = {}
+    occupied: Dict[int, int] = {}
+    credits = {code: int(planned[code].get("credits") or 0) for code in planned}
+    for code in planned:
+        if code in affected:
+            continue
+        if code in state.term:
+            t = state.term[code]
+            new.term[code], new.pattern[code] = t, state.pattern[code]
+            load[t] = load.get(t, 0) + credits[code]
+            occupied[t] = occupied.get(t, 0) | state.pattern[code][0]
+        elif code in state.unscheduled:
+            new.unscheduled[code] = state.unscheduled[code]
+
+    first = solver.term_index(state.start_term) if state.start_term else None
+    first = first if first is not None else solver.current_term_index()
+
+    # Affected courses in prerequisite order, earliest requested term first
+    def release(code: str) -> int:
+        requested = solver.term_index(planned[code].get("term"))
+        return max(first, requested if requested is not None else first)
+
+    indegree = {c: sum(1 for p in parents[c] if p in affected) for c in affected}
+    heap = [(release(c), c) for c, n in indegree.items() if n == 0]
+    heapq.heapify(heap)
+    while heap:
+        _, code = heapq.heappop(heap)
+        for k in children.get(code, ()):
+            if k in indegree:
+                indegree[k] -= 1
+                if indegree[k] == 0:
+                    heapq.heappush(heap, (release(k), k))
+        _place(new, state, code, planned[code], credits[code], parents[code], release(code), load, occupied)
+
+    return new, stats("incremental")
+
+
+def _place(state: PlanState, old: PlanState, code: str, course: dict, credits: int, parents: List[str],
+           earliest: int, load: Dict[int, int], occupied: Dict[int, int]):
+    if credits > state.max_credits:
+        state.unscheduled[code] = f"{credits} credits exceeds the {state.max_credits}-credit term limit."
+        return
+    for p in parents:
+        if p in state.unscheduled:
+            state.unscheduled[code] = f"Prerequisite {p} could not be scheduled."
+            return
+        earliest = max(earliest, solver.next_term(state.term[p], state.include_summer))
+    if not state.include_summer and earliest % len(solver.SEASONS) == SUMMER:
+        earliest = solver.next_term(earliest, state.include_summer)
+
+    patterns = solver.meeting_patterns(course.get("prefs"), credits)
+    old_term, old_pattern = old.term.get(code), old.pattern.get(code)
+    if old_term is not None and old_term >= earliest and old_pattern in patterns \
+            and load.get(old_term, 0) + credits <= state.max_credits and not old_pattern[0] & occupied.get(old_term, 0):
+        t, pattern = old_term, old_pattern
+    else:
+        t, pattern = earliest, None
+        while pattern is None:
+            if load.get(t, 0) + credits <= state.max_credits:
+                pattern = next((p for p in patterns if not p[0] & occupied.get(t, 0)), None)
+            if pattern is None:
+                t = solver.next_term(t, state.include_summer)
+    state.term[code], state.pattern[code] = t, pattern
+    load[t] = load.get(t, 0) + credits
+    occupied[t] = occupied.get(t, 0) | pattern[0]
+
+
+def delta(old: PlanState, new: PlanState) -> dict:
+    """What changed between two plans: added/removed/moved/retimed courses and new unscheduled ones."""
+    out = {"added": [], "removed": [], "moved": [], "retimed": [], "unscheduled": []}
+    for code in sorted(new.term, key=lambda c: (new.term[c], c)):
+        t = new.term[code]
+        if code not in old.term:
+            out["added"].append({"code": code, "term": solver.term_name(t)})
+        elif old.term[code] != t:
+            out["moved"].append({"code": code, "from": solver.term_name(old.term[code]), "to": solver.term_name(t)})
+        elif old.pattern[code] != new.pattern[code]:
+            out["retimed"].append({"code": code, "term": solver.term_name(t)})
+    out["removed"] = [{"code": c, "term": solver.term_name(old.term[c])}
+                      for c in sorted(old.term) if c not in new.term]
+    out["unscheduled"] = [{"code": c, "reason": r} for c, r in new.unscheduled.items()
+                          if old.unscheduled.get(c) != r]
+    return out
+
+
+class PlanStore:
+    """Bounded LRU of the last PlanState per plan id (thread-safe)."""
+
+    def __init__(self, max_entries: int = PLAN_STORE_MAX):
+        self.max_entries = max_entries
+        self._plans: "OrderedDict[str, PlanState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def get(self, plan_id: str) -> Optional[PlanState]:
+        with self._lock:
+            state = self._plans.get(plan_id)
+            if state is not None:
+                self._plans.move_to_end(plan_id)
+            return state
+
+    def put(self, plan_id: str, state: PlanState):
+        with self._lock:
+            self._plans[plan_id] = state
+            self._plans.move_to_end(plan_id)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
@@ -0,0 +1,391 @@
+# schedule_validation.py
+"""
+Checks a proposed schedule (solver or LLM output) against the request it
+answers, and repairs it without another LLM round trip.
+
+validate_schedule() makes one pass over the schedule entries and one over
+their prerequisite edges, so it is O(courses + edges). Violations are
+dicts {"type", "code", "term", "message"}; the types are:
+
+    malformed       an entry that is not an object, has no usable code, or has
+                    days/time/credits of the wrong type (those fields are dropped)
+    unknown_term    suggested_term is missing or not "<Season> <year>"
+    duplicate       the course appears more than once
+    completed       the course is already completed
+    not_requested   the course is not one of the request's planned courses
+    missing         a planned course is not in the schedule
+    summer_term     placed in a Summer term while summer is off
+    too_early       before the start term or the course's requested term
+    prerequisite    a prerequisite is neither completed nor in an earlier term
+    credit_limit    a term is over the credit limit (code is None)
+    prefs           meeting days/time/modality outside the course's prefs
+    time_clash      two courses share a meeting slot in the same term
+
+repair_schedule() keeps every course that is legal where it is. Anything
+else moves to its earliest legal term, then later terms while that term is
+over the credit limit or has no free meeting pattern for it. Duplicates,
+completed courses, courses that were never requested and malformed entries
+are dropped, and missing planned courses are added. check_schedule()
+validates and repairs only when needed; validate_many() is the batch form
+for offline audits.
+"""
+
+import heapq
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from solver import (BLOCK_TIMES, BLOCKS_PER_PERIOD, DAYS, DEFAULT_MAX_CREDITS, PERIODS, SEASONS, SLOTS_PER_DAY,
+                    current_term_index, meeting_patterns, next_term, normalize_code, normalize_days,
+                    term_index, term_name)
+from validation import find_prerequisites
+
+SUMMER = SEASONS.index("Summer")
+BLOCK_BY_TIME = {f"{start}-{end}": i for i, (start, end) in enumerate(BLOCK_TIMES)}
+
+
+def _clean(schedule: Any) -> Tuple[List[dict], List[dict]]:
+    """
+    (entries safe to check, "malformed" violations). LLM output can hold
+    anything: entries without a string code are left out, and days, time,
+    credits or suggested_term of the wrong type are dropped from the entry.
+    """
+    if not isinstance(schedule, list):
+        return [], [{"type": "malformed", "code": None, "term": None,
+                     "message": f"planned_schedule is a {type(schedule).__name__}, not a list."}]
+    entries, violations = [], []
+
+    def bad(code: Optional[str], message: str):
+        violations.append({"type": "malformed", "code": code, "term": None, "message": message})
+
+    for i, entry in enumerate(schedule):
+        if not isinstance(entry, dict):
+            bad(None, f"Entry {i} is not an object.")
+            continue
+        code = entry.get("code")
+        if not isinstance(code, str) or not code.strip():
+            bad(None, f"Entry {i} has no course code ({code!r}).")
+            continue
+        entry = dict(entry)
+        for key, ok in (("suggested_term", isinstance(entry.get("suggested_term"), str)),
+                        ("days", isinstance(entry.get("days"), list)
+                         and all(isinstance(d, str) for d in entry["days"])),
+                        ("time", isinstance(entry.get("time"), str)),
+                        ("credits", isinstance(entry.get("credits"), (int, float))
+                         and not isinstance(entry["credits"], bool))):
+            if key in entry and entry[key] is not None and not ok:
+                bad(normalize_code(code), f"{normalize_code(code)} has an invalid {key} ({entry[key]!r}).")
+                del entry[key]
+        entries.append(entry)
+    return entries, violations
+
+
+def _context(courses: List[dict], start_term: Optional[str]) -> Tuple[set, Dict[str, dict], int]:
+    """(completed codes, planned code -> course, first allowed term index) for a request."""
+    completed = {normalize_code(c["code"]) for c in courses if c.get("status") == "completed"}
+    planned: Dict[str, dict] = {}
+    for c in courses:
+        code = normalize_code(c["code"])
+        if c.get("status", "planned") == "planned" and code not in completed:
+            planned.setdefault(code, c)
+    first = term_index(start_term) if start_term else None
+    return completed, planned, first if first is not None else current_term_index()
+
+
+def _release(course: dict, first_term: int) -> int:
+    requested = term_index(course.get("term"))
+    return max(first_term, requested if requested is not None else first_term)
+
+
+def _credits(course: dict, entry: dict) -> int:
+    return int(course.get("credits") or entry.get("credits") or 0)
+
+
+def _slots(entry: dict) -> Optional[Tuple[int, Tuple[int, ...], int]]:
+    """(slot mask, day indexes, block) for an entry that has days and a known time, else None."""
+    block = BLOCK_BY_TIME.get(entry.get("time"))
+    days = normalize_days(entry.get("days"))
+    if block is None or not days:
+        return None
+    mask = 0
+    for d in days:
+        mask |= 1 << (d * SLOTS_PER_DAY + block)
+    return mask, tuple(days), block
+
+
+def _prefs_problem(entry: dict, course: dict, days: Tuple[int, ...], block: int) -> Optional[str]:
+    prefs = course.get("prefs") or {}
+    wanted = normalize_days(prefs.get("days"))
+    if wanted and not set(days) <= set(wanted):
+        return f"meets on {', '.join(DAYS[d] for d in days)} outside the preferred days"
+    tod = prefs.get("timeOfDay") or "Any"
+    if tod in PERIODS and PERIODS[block // BLOCKS_PER_PERIOD] != tod:
+        return f"meets in the {PERIODS[block // BLOCKS_PER_PERIOD]}, not the preferred {tod}"
+    modality = prefs.get("modality") or "Any"
+    if modality != "Any" and entry.get("modality") and entry["modality"] != modality:
+        return f"is {entry['modality']}, not the preferred {modality}"
+    return None
+
+
+# ------------ Validation -----------------------------------------------
+
+def validate_schedule(
+    schedule: List[dict],
+    courses: List[dict],
+    max_credits: int = DEFAULT_MAX_CREDITS,
+    include_summer: bool = False,
+    start_term: Optional[str] = None,
+    prereq_fn: Callable[[str], list] = find_prerequisites,
+) -> dict:
+    """
+    Check `schedule` (planned_schedule entries: code, suggested_term and
+    optionally days/time/modality) against the request's `courses`, shaped
+    like main.Course. Returns {"valid", "violations", "credits"} where
+    credits is the load per term.
+    """
+    completed, planned, first_term = _context(courses, start_term)
+    schedule, violations = _clean(schedule)
+
+    def add(kind: str, code: Optional[str], term: Optional[str], message: str):
+        violations.append({"type": kind, "code": code, "term": term, "message": message})
+
+    placed: Dict[str, int] = {}
+    load: Dict[int, int] = {}
+    occupied: Dict[Tuple[int, int], str] = {}  # (term, slot bit) -> code
+    for entry in schedule:
+        code = normalize_code(entry.get("code"))
+        label = entry.get("suggested_term")
+        t = term_index(label)
+        if t is None:
+            add("unknown_term", code, label, f"{code} has no valid term ({label!r}).")
+            continue
+        if code in placed:
+            add("duplicate", code, label, f"{code} is scheduled more than once.")
+            continue
+        placed[code] = t
+        if code in completed:
+            add("completed", code, label, f"{code} is already completed.")
+        elif code not in planned:
+            add("not_requested", code, label, f"{code} is not one of the planned courses.")
+        if t % len(SEASONS) == SUMMER and not include_summer:
+            add("summer_term", code, label, f"{code} is in {label}, but summer terms are off.")
+        course = planned.get(code) or {}
+        earliest = _release(course, first_term)
+        if t < earliest:
+            add("too_early", code, label, f"{code} is in {label}, before {term_name(earliest)}.")
+        load[t] = load.get(t, 0) + _credits(course, entry)
+
+        slots = _slots(entry)
+        if slots is None:
+            continue
+        mask, days, block = slots
+        problem = _prefs_problem(entry, course, days, block)
+        if problem:
+            add("prefs", code, label, f"{code} {problem}.")
+        for d in days:
+            other = occupied.setdefault((t, d * SLOTS_PER_DAY + block), code)
+            if other != code:
+                add("time_clash", code, label, f"{code} and {other} meet at the same time on {DAYS[d]}.")
+                break
+
+    for code, t in placed.items():
+        if code in completed:
+            continue
+        for p in prereq_fn(code):
+            p = normalize_code(p)
+            if p in completed:
+                continue
+            pt = placed.get(p)
+            if pt is None:
+                add("prerequisite", code, term_name(t), f"{code} requires {p}, which is neither completed nor scheduled.")
+            elif pt >= t:
+                add("prerequisite", code, term_name(t),
+                    f"{code} is in {term_name(t)} but its prerequisite {p} is in {term_name(pt)}.")
+
+    for t in sorted(load):
+        if load[t] > max_credits:
+            add("credit_limit", None, term_name(t), f"{term_name(t)} has {load[t]} credits (limit {max_credits}).")
+    for code in planned:
+        if code not in placed:
+            add("missing", code, None, f"{code} is planned but not scheduled.")
+
+    return {
+        "valid": not violations,
+        "violations": violations,
+        "credits": {term_name(t): load[t] for t in sorted(load)},
+    }
+
+
+# ------------ Repair ---------------------------------------------------
+
+def repair_schedule(
+    schedule: List[dict],
+    courses: List[dict],
+    max_credits: int = DEFAULT_MAX_CREDITS,
+    include_summer: bool = False,
+    start_term: Optional[str] = None,
+    prereq_fn: Callable[[str], list] = find_prerequisites,
+) -> dict:
+    """
+    Minimal repair of `schedule`. Courses are visited in prerequisite order
+    (earliest proposed term first); each stays put when that term is legal
+    and has room, otherwise it moves to the earliest term that is. Entries
+    with meeting times get a new pattern from their prefs when they clash.
+    Returns {"planned_schedule", "moves", "dropped", "valid", "violations"},
+    where violations are whatever could not be repaired.
+    """
+    completed, planned, first_term = _context(courses, start_term)
+    schedule, malformed = _clean(schedule)
+    entries: Dict[str, dict] = {}
+    dropped: List[dict] = [{"code": v["code"], "reason": v["message"]} for v in malformed if v["code"] is None]
+    for entry in schedule:
+        code = normalize_code(entry.get("code"))
+        if code in completed:
+            dropped.append({"code": code, "reason": "already completed"})
+        elif code in entries:
+            dropped.append({"code": code, "reason": "duplicate"})
+        elif code not in planned:
+            dropped.append({"code": code, "reason": "not one of the planned courses"})
+        else:
+            entries[code] = dict(entry, code=code)
+    for code, c in planned.items():
+        if code not in entries and int(c.get("credits") or 0) <= max_credits:
+            entries[code] = {"code": code, "title": c.get("title"), "credits": int(c.get("credits") or 0),
+                             "suggested_term": None}
+
+    parents = {code: [] for code in entries}
+    children = {code: [] for code in entries}
+    for code in entries:
+        for p in prereq_fn(code):
+            p = normalize_code(p)
+            if p in entries and p != code:
+                parents[code].append(p)
+                children[p].append(code)
+
+    def proposed(code: str) -> Optional[int]:
+        return term_index(entries[code].get("suggested_term"))
+
+    def priority(code: str) -> tuple:
+        t = proposed(code)
+        return (t if t is not None else _release(planned.get(code) or {}, first_term), code)
+
+    indegree = {code: len(ps) for code, ps in parents.items()}
+    heap = [priority(code) for code, n in indegree.items() if n == 0]
+    heapq.heapify(heap)
+    order: List[str] = []
+    while heap:
+        _, code = heapq.heappop(heap)
+        order.append(code)
+        for k in children[code]:
+            indegree[k] -= 1
+            if indegree[k] == 0:
+                heapq.heappush(heap, priority(k))
+    # A prerequisite cycle (only possible with a custom prereq_fn) is left in proposed order
+    order += sorted((c for c in entries if indegree[c] > 0), key=priority)
+
+    final: Dict[str, int] = {}
+    load: Dict[int, int] = {}
+    occupied: Dict[int, int] = {}  # term -> slot mask
+    moves: List[dict] = []
+    for code in order:
+        entry, course = entries[code], planned.get(code) or {}
+        credits = _credits(course, entry)
+        earliest, reason = _release(course, first_term), "before the start term or requested term"
+        for p in parents[code]:
+            if p in final and next_term(final[p], include_summer) > earliest:
+                earliest, reason = next_term(final[p], include_summer), f"after its prerequisite {p}"
+        if not include_summer and earliest % len(SEASONS) == SUMMER:
+            earliest = next_term(earliest, include_summer)
+
+        current = proposed(code)
+        legal = current is not None and current >= earliest and (include_summer or current % len(SEASONS) != SUMMER)
+        t = current if legal else earliest
+        if current is None:
+            reason = "missing from the schedule" if entry.get("suggested_term") is None else "no valid term"
+        elif legal:
+            reason = "credit limit"
+        elif current % len(SEASONS) == SUMMER and current >= earliest:
+            reason = "summer terms are off"
+
+        def has_room(term: int) -> bool:
+            return credits > max_credits or load.get(term, 0) + credits <= max_credits
+
+        while not has_room(t):
+            t = next_term(t, include_summer)
+
+        slots = _slots(entry)
+        retimed = None
+        if slots is not None:
+            mask, days, block = slots
+            prefs_problem = _prefs_problem(entry, course, days, block)
+            problem = prefs_problem or ("clashed with another course" if mask & occupied.get(t, 0) else None)
+            if problem:
+                # As replan._place: the first term from here with credit room and a free pattern
+                candidates = ([] if prefs_problem else [slots]) + meeting_patterns(course.get("prefs"), credits)
+                candidates = candidates or [slots]
+                chosen, start_t = None, t
+                while chosen is None:
+                    if has_room(t):
+                        chosen = next((c for c in candidates if not c[0] & occupied.get(t, 0)), None)
+                    if chosen is None:
+                        t = next_term(t, include_summer)
+                if t != start_t:
+                    reason = f"no free meeting time in {term_name(start_t)}"
+                if chosen is not slots:
+                    pat_mask, pat_days, pat_block = chosen
+                    start, end = BLOCK_TIMES[pat_block]
+                    entry["days"] = [DAYS[d] for d in pat_days]
+                    entry["timeOfDay"] = PERIODS[pat_block // BLOCKS_PER_PERIOD]
+                    entry["time"] = f"{start}-{end}"
+                    mask, retimed = pat_mask, f"new meeting time: {problem}"
+            occupied[t] = occupied.get(t, 0) | mask
+
+        final[code] = t
+        load[t] = load.get(t, 0) + credits
+        entry["suggested_term"] = term_name(t)
+        if t != current or retimed:
+            moves.append({"code": code, "from": term_name(current) if current is not None else None,
+                          "to": term_name(t), "reason": reason if t != current else retimed})
+
+    repaired = sorted(entries.values(), key=lambda e: (final[e["code"]], e["code"]))
+    after = validate_schedule(repaired, courses, max_credits, include_summer, start_term, prereq_fn)
+    return {
+        "planned_schedule": repaired,
+        "moves": moves,
+        "dropped": dropped,
+        "valid": after["valid"],
+        "violations": after["violations"],
+    }
+
+
+def check_schedule(schedule: List[dict], courses: List[dict], repair: bool = True, **rules) -> dict:
+    """
+    Validate, and (with `repair`) repair only if something is wrong. Returns
+    {"valid", "violations", "repaired", "planned_schedule", "moves", "dropped",
+    "remaining"}: violations are those found in the input, remaining those
+    left after repair, and planned_schedule is the schedule to use.
+    """
+    report = validate_schedule(schedule, courses, **rules)  # malformed entries are reported, not raised on
+    result = {"valid": report["valid"], "violations": report["violations"], "repaired": False,
+              "planned_schedule": _clean(schedule)[0], "moves": [], "dropped": [], "remaining": report["violations"]}
+    if report["valid"] or not repair:
+        return result
+    fixed = repair_schedule(schedule, courses, **rules)
+    result.update(repaired=True, planned_schedule=fixed["planned_schedule"], moves=fixed["moves"],
+                  dropped=fixed["dropped"], remaining=fixed["violations"])
+    return result
+
+
+def validate_many(items: List[dict], repair: bool = False) -> List[dict]:
+    """
+    Batch form for offline audits; runs inside worker processes for
+    /api/schedule/validate/batch. Each item is {"planned_schedule", "courses"}
+    plus optional "maxCreditsPerTerm", "includeSummer" and "startTerm".
+    """
+    out = []
+    for item in items:
+        rules = {
+            "max_credits": item.get("maxCreditsPerTerm") or DEFAULT_MAX_CREDITS,
+            "include_summer": bool(item.get("includeSummer")),
+            "start_term": item.get("startTerm"),
+        }
+        out.append(check_schedule(item.get("planned_schedule") or [], item.get("courses") or [], repair, **rules))
+    return out
@@ -0,0 +1,295 @@
+# sessions.py
+"""
+Conversation state per chatSessionId.
+
+A Session keeps what a client would otherwise have to resend every time:
+
+- the last few conversation turns (SESSION_KEEP_TURNS, each cut to
+  SESSION_TURN_CHARS); older turns are compacted into one-line summaries,
+  and the summary keeps only its newest SESSION_SUMMARY_CHARS characters;
+- the student schema from normalize.normalize_student_input, merged across
+  messages;
+- the last solver plan, as a replan.PlanState, so PATCH /api/schedule works
+  on a session's plan without a separate plan id.
+
+context() is what goes into a prompt. It is bounded by those three settings,
+so a prompt costs the same on turn 5 and on turn 500.
+
+SessionStore holds sessions in an LRU capped at SESSION_MAX_BYTES, the
+approximate size of their JSON form. A session's plan is encoded once per
+set_plan, not on every turn. Sessions idle longer than SESSION_TTL
+expire. Sessions evicted for space are spilled to SQLite when
+SESSION_SPILL_PATH is set (the default) and are loaded back on their next
+request; with an empty path they are dropped.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import normalize
+from replan import PlanState
+
+MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", 64 * 1024 * 1024))  # in-memory sessions, all together
+TTL = float(os.getenv("SESSION_TTL", 7 * 24 * 60 * 60))  # seconds since last use
+SPILL_PATH = os.getenv("SESSION_SPILL_PATH", os.path.join(os.getcwd(), "sessions.sqlite3"))
+KEEP_TURNS = int(os.getenv("SESSION_KEEP_TURNS", 6))  # turns kept verbatim
+TURN_CHARS = int(os.getenv("SESSION_TURN_CHARS", 600))  # longest stored turn
+SUMMARY_CHARS = int(os.getenv("SESSION_SUMMARY_CHARS", 1200))  # compacted history
+SUMMARY_LINE_CHARS = 160  # one compacted turn
+PRUNE_EVERY = 256  # writes between sweeps of expired sessions
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def merge_schema(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fold a newly normalized message into the session's schema. Fields the new
+    message did not mention keep their old value; courses are merged by code;
+    a preference only changes when the new message sets a non-default value.
+    """
+    merged = dict(old)
+    for key in ("major", "minor", "target_graduation"):
+        if new.get(key):
+            merged[key] = new[key]
+    if new.get("courses_taken"):
+        courses = {c["code"]: c for c in old.get("courses_taken") or []}
+        courses.update((c["code"], c) for c in new["courses_taken"])
+        merged["courses_taken"] = list(courses.values())
+    prefs = dict(old.get("preferences") or normalize.DEFAULT_PREFERENCES)
+    for key, value in (new.get("preferences") or {}).items():
+        if value != normalize.DEFAULT_PREFERENCES.get(key):
+            prefs[key] = value
+    merged["preferences"] = prefs
+    return merged
+
+
+class Session:
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.turns: List[Dict[str, str]] = []  # {"role": "user"|"assistant", "content"}
+        self.summary: List[str] = []  # one line per compacted turn, oldest first
+        self.compacted = 0  # turns folded into the summary so far (including ones since dropped from it)
+        self.schema: Dict[str, Any] = normalize.normalize_student_input(None)
+        self._plan: Optional[PlanState] = None
+        self._plan_json: Optional[str] = None  # encoded plan, reused until the plan changes
+        self.updated = time.time()
+
+    @property
+    def plan(self) -> Optional[PlanState]:
+        return self._plan
+
+    @plan.setter
+    def plan(self, plan: Optional[PlanState]):
+        self._plan = plan
+        self._plan_json = None
+
+    def add_turn(self, role: str, content: str, keep_turns: int = KEEP_TURNS):
+        self.turns.append({"role": role, "content": _clip(content, TURN_CHARS)})
+        while len(self.turns) > keep_turns:
+            old = self.turns.pop(0)
+            self.summary.append(f"{old['role']}: {_clip(old['content'], SUMMARY_LINE_CHARS)}")
+            self.compacted += 1
+        while self.summary and sum(len(line) + 1 for line in self.summary) > SUMMARY_CHARS:
+            self.summary.pop(0)
+
+    def context(self) -> Dict[str, Any]:
+        """Bounded prompt context: compacted summary, recent turns and the student's stated facts."""
+        student = {k: self.schema.get(k) for k in ("major", "minor", "target_graduation") if self.schema.get(k)}
+        prefs = {k: v for k, v in (self.schema.get("preferences") or {}).items()
+                 if v != normalize.DEFAULT_PREFERENCES.get(k)}
+        if prefs:
+            student["preferences"] = prefs
+        out: Dict[str, Any] = {}
+        if self.summary:
+            out["summary"] = "\n".join(self.summary)
+        if self.turns:
+            out["recent"] = [[t["role"], t["content"]] for t in self.turns]
+        if student:
+            out["student"] = student
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "turns": self.turns, "summary": self.summary, "compacted": self.compacted,
+                "schema": self.schema, "plan": self.plan.to_dict() if self.plan else None,
+                "updated": self.updated}
+
+    def to_json(self) -> str:
+        """Compact JSON of to_dict(), with the plan's part encoded only after it changes."""
+        if self._plan_json is None:
+            self._plan_json = json.dumps(self._plan.to_dict(), separators=(",", ":")) if self._plan else "null"
+        rest = json.dumps({"id": self.id, "turns": self.turns, "summary": self.summary, "compacted": self.compacted,
+                           "schema": self.schema, "updated": self.updated}, separators=(",", ":"))
+        return f'{rest[:-1]},"plan":{self._plan_json}}}'
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Session":
+        session = cls(data["id"])
+        session.turns = data["turns"]
+        session.summary = data["summary"]
+        session.compacted = data["compacted"]
+        session.schema = data["schema"]
+        session.plan = PlanState.from_dict(data["plan"]) if data["plan"] else None
+        session.updated = data["updated"]
+        return session
+
+
+class SessionStore:
+    """
+    Thread-safe LRU of sessions under a byte cap, with TTL expiry and optional
+    SQLite spill. Its methods encode JSON and may write SQLite, so async
+    callers run them in a thread.
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES, ttl: float = TTL, path: Optional[str] = SPILL_PATH,
+                 keep_turns: int = KEEP_TURNS):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.keep_turns = keep_turns
+        self._mem: "OrderedDict[str, tuple]" = OrderedDict()  # id -> (session, size in bytes)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._writes = 0
+        self.stats = {"evictions": 0, "spilled": 0, "restored": 0, "expired": 0}
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, value TEXT NOT NULL, updated REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._mem)
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._bytes
+
+    # ------------ Internals (call with the lock held) -----------------
+
+    def _expired(self, session: Session) -> bool:
+        return session.updated + self.ttl < time.time()
+
+    def _drop(self, session_id: str):
+        session, size = self._mem.pop(session_id, (None, 0))
+        self._bytes -= size
+
+    def _load(self, session_id: str) -> Optional[Session]:
+        entry = self._mem.get(session_id)
+        if entry is not None:
+            if not self._expired(entry[0]):
+                self._mem.move_to_end(session_id)
+                entry[0].updated = time.time()
+                return entry[0]
+            self._drop(session_id)
+            self.stats["expired"] += 1
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT value FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        session = Session.from_dict(json.loads(row[0]))
+        # The memory copy is the live one from here on; it is written again if evicted
+        self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        self._db.commit()
+        if self._expired(session):
+            self.stats["expired"] += 1
+            return None
+        self.stats["restored"] += 1
+        self._save(session)
+        return session
+
+    def _save(self, session: Session):
+        """(Re)account a session's size after a change and evict down to the cap."""
+        session.updated = time.time()
+        blob = session.to_json()
+        self._drop(session.id)
+        self._mem[session.id] = (session, len(blob))
+        self._bytes += len(blob)
+        while self._bytes > self.max_bytes and len(self._mem) > 1:
+            old_id, (old, size) = self._mem.popitem(last=False)
+            self._bytes -= size
+            self.stats["evictions"] += 1
+            if self._db is not None and not self._expired(old):
+                self._db.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+                                 (old_id, old.to_json(), old.updated))
+                self._db.commit()
+                self.stats["spilled"] += 1
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self._prune()
+
+    def _prune(self):
+        for session_id in [i for i, (s, _) in self._mem.items() if self._expired(s)]:
+            self._drop(session_id)
+            self.stats["expired"] += 1
+        if self._db is not None:
+            self._db.execute("DELETE FROM sessions WHERE updated < ?", (time.time() - self.ttl,))
+            self._db.commit()
+
+    def _get_or_create(self, session_id: str) -> Session:
+        return self._load(session_id) or Session(session_id)
+
+    # ------------ Public API ------------------------------------------
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            return self._load(session_id)
+
+    def add_turn(self, session_id: str, role: str, content: str) -> Session:
+        with self._lock:
+            session = self._get_or_create(session_id)
+            session.add_turn(role, content, self.keep_turns)
+            self._save(session)
+            return session
+
+    def merge_schema(self, session_id: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge a normalized message into the session's schema; returns the merged schema."""
+        with self._lock:
+            session = self._get_or_create(session_id)
+            session.schema = merge_schema(session.schema, schema)
+            self._save(session)
+            return session.schema
+
+    def set_plan(self, session_id: str, plan: PlanState) -> Session:
+        with self._lock:
+            session = self._get_or_create(session_id)
+            session.plan = plan
+            self._save(session)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            found = session_id in self._mem
+            self._drop(session_id)
+            if self._db is not None:
+                found = self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount > 0 or found
+                self._db.commit()
+            return found
+
+    def snapshot(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Public view of a session for GET /api/sessions/{id}."""
+        with self._lock:
+            session = self._load(session_id)
+            if session is None:
+                return None
+            return {
+                "chatSessionId": session.id,
+                "turns": list(session.turns),
+                "summary": list(session.summary),
+                "compacted_turns": session.compacted,
+                "normalized_schema": session.schema,
+                "has_plan": session.plan is not None,
+                "updated": session.updated,
+                "bytes": self._mem[session.id][1],
+            }
@@ -0,0 +1,370 @@
+# solver.py
+"""
+Deterministic schedule builder used by /api/schedule/build.
+
+Planned courses are assigned to terms and weekly meeting slots without any
+LLM call. The week is a grid of slots encoded as bits of a Python int, so a
+candidate meeting pattern is a single bitmask and a clash check is one `&`.
+
+Search is term by term: the courses whose prerequisites are already placed
+compete for the term (longest remaining prerequisite chain first), and the
+chosen set is packed into slots with a backtracking search that uses
+minimum-remaining-values ordering and forward checking. Anything that does
+not fit rolls over to the next term.
+"""
+
+import time
+from itertools import combinations
+from typing import Callable, Dict, List, Optional, Tuple
+
+from catalog import normalize_code
+from validation import find_prerequisites
+
+# ------------ Weekly slot grid ----------------------------------------
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+WEEKDAYS = DAYS[:5]
+PERIODS = ["Morning", "Afternoon", "Evening"]
+
+# Two meeting blocks per period; slot bit = day * SLOTS_PER_DAY + block
+BLOCK_TIMES = [
+    ("08:30", "10:00"), ("10:00", "11:30"),  # Morning
+    ("13:00", "14:30"), ("14:30", "16:00"),  # Afternoon
+    ("17:30", "19:00"), ("19:00", "20:30"),  # Evening
+]
+BLOCKS_PER_PERIOD = 2
+SLOTS_PER_DAY = len(BLOCK_TIMES)
+
+# Preferred day pairings for two-meeting courses, tried before the others
+STANDARD_PAIRS = [("Mon", "Wed"), ("Tue", "Thu"), ("Wed", "Fri"), ("Mon", "Fri")]
+
+DEFAULT_MAX_CREDITS = 15
+SEASONS = ["Spring", "Summer", "Fall"]
+TERM_YEARS = range(1900, 2201)  # years term_index accepts; anything else is treated as unparseable
+DEFAULT_NODE_BUDGET = 20000
+
+
+def _slot_bit(day: int, block: int) -> int:
+    return 1 << (day * SLOTS_PER_DAY + block)
+
+
+def normalize_days(days: List[str]) -> List[int]:
+    """Map day names ("Mon", "monday", "TUE") to day indexes; unknown names are ignored."""
+    idx = []
+    for d in days or []:
+        key = d.strip()[:3].capitalize()
+        if key in DAYS and DAYS.index(key) not in idx:
+            idx.append(DAYS.index(key))
+    return sorted(idx)
+
+
+def meeting_patterns(prefs: Optional[dict], credits: int) -> List[Tuple[int, Tuple[int, ...], int]]:
+    """
+    All meeting patterns allowed by a course's prefs, as (mask, day indexes, block).
+
+    Courses of 3+ credits meet twice a week when the prefs allow at least two
+    days, otherwise once. Patterns come out in a stable order so the solver is
+    deterministic: standard day pairs first, then earlier blocks first.
+    """
+    prefs = prefs or {}
+    days = normalize_days(prefs.get("days") or []) or list(range(len(WEEKDAYS)))
+    tod = prefs.get("timeOfDay") or "Any"
+    periods = [PERIODS.index(tod)] if tod in PERIODS else list(range(len(PERIODS)))
+    blocks = [p * BLOCKS_PER_PERIOD + b for p in periods for b in range(BLOCKS_PER_PERIOD)]
+
+    if credits >= 3 and len(days) >= 2:
+        standard = [(DAYS.index(a), DAYS.index(b)) for a, b in STANDARD_PAIRS]
+        day_sets = [p for p in standard if p[0] in days and p[1] in days]
+        day_sets += [p for p in combinations(days, 2) if p not in day_sets]
+    else:
+        day_sets = [(d,) for d in days]
+
+    patterns = []
+    for block in blocks:
+        for ds in day_sets:
+            mask = 0
+            for d in ds:
+                mask |= _slot_bit(d, block)
+            patterns.append((mask, ds, block))
+    return patterns
+
+
+# ------------ Terms ----------------------------------------------------
+
+def term_index(term: Optional[str]) -> Optional[int]:
+    """"Fall 2025" -> sortable integer (year * 3 + season), or None if unparseable or outside TERM_YEARS."""
+    parts = (term or "").split()
+    if len(parts) != 2 or parts[0].capitalize() not in SEASONS or not parts[1].isdigit() \
+            or int(parts[1]) not in TERM_YEARS:
+        return None
+    return int(parts[1]) * len(SEASONS) + SEASONS.index(parts[0].capitalize())
+
+
+def term_name(index: int) -> str:
+    year, season = divmod(index, len(SEASONS))
+    return f"{SEASONS[season]} {year}"
+
+
+def next_term(index: int, include_summer: bool = False) -> int:
+    index += 1
+    if not include_summer and index % len(SEASONS) == SEASONS.index("Summer"):
+        index += 1
+    return index
+
+
+def current_term_index(today=None) -> int:
+    """The term a student would register for next (Spring before June, otherwise Fall)."""
+    from datetime import date
+    today = today or date.today()
+    season = "Spring" if today.month < 6 else "Fall"
+    return today.year * len(SEASONS) + SEASONS.index(season)
+
+
+# ------------ Term packing (CSP) --------------------------------------
+
+def _pack(domains: List[List[tuple]], budget: List[int]) -> Optional[List[tuple]]:
+    """
+    Give every course in `domains` a pattern with no slot clashes.
+
+    Backtracking with MRV variable ordering and forward checking. `budget` is a
+    one-element list of remaining search nodes so a pathological term cannot
+    stall the request. Returns None when infeasible or out of budget.
+    """
+    n = len(domains)
+    chosen: List[Optional[tuple]] = [None] * n
+
+    def search(remaining: Dict[int, List[tuple]], occupied: int) -> bool:
+        if not remaining:
+            return True
+        # MRV: the course with the fewest free patterns goes next
+        var = min(remaining, key=lambda i: (len(remaining[i]), i))
+        options = remaining.pop(var)
+        for pat in options:
+            budget[0] -= 1
+            if budget[0] < 0:
+                break
+            occ = occupied | pat[0]
+            pruned = {}
+            for i, dom in remaining.items():
+                free = [p for p in dom if not p[0] & occ]
+                if not free:
+                    break
+                pruned[i] = free
+            else:
+                chosen[var] = pat
+                if search(pruned, occ):
+                    return True
+        remaining[var] = options
+        return False
+
+    if search({i: list(d) for i, d in enumerate(domains)}, 0):
+        return chosen  # type: ignore[return-value]
+    return None
+
+
+# ------------ Solver ---------------------------------------------------
+
+def _chain_lengths(codes: List[str], parents: Dict[str, List[str]]) -> Dict[str, int]:
+    """Length of the longest chain of planned dependents hanging off each course."""
+    children: Dict[str, List[str]] = {c: [] for c in codes}
+    for c in codes:
+        for p in parents[c]:
+            children[p].append(c)
+    memo: Dict[str, int] = {}
+
+    def depth(c: str) -> int:
+        if c not in memo:
+            memo[c] = 0  # cycle guard
+            memo[c] = 1 + max((depth(k) for k in children[c]), default=0)
+        return memo[c]
+
+    for c in codes:
+        depth(c)
+    return memo
+
+
+def split_courses(courses: List[dict]) -> Tuple[set, Dict[str, dict], List[str]]:
+    """(completed codes, planned code -> course, warnings); the first entry of a repeated code wins."""
+    warnings: List[str] = []
+    completed = {normalize_code(c["code"]) for c in courses if c.get("status") == "completed"}
+    planned: Dict[str, dict] = {}
+    for c in courses:
+        if c.get("status", "planned") != "planned":
+            continue
+        code = normalize_code(c["code"])
+        if code in completed:
+            warnings.append(f"{code} is already completed; skipped.")
+        elif code in planned:
+            warnings.append(f"{code} is listed more than once; using the first entry.")
+        else:
+            planned[code] = c
+    return completed, planned, warnings
+
+
+def schedule_entry(code: str, course: dict, credits: int, term: int, pattern: tuple) -> dict:
+    """One planned_schedule entry for a course placed in `term` with meeting `pattern`."""
+    mask, days, block = pattern
+    start, end = BLOCK_TIMES[block]
+    modality = (course.get("prefs") or {}).get("modality") or "Any"
+    return {
+        "code": code,
+        "title": course.get("title"),
+        "credits": credits,
+        "suggested_term": term_name(term),
+        "days": [DAYS[d] for d in days],
+        "timeOfDay": PERIODS[block // BLOCKS_PER_PERIOD],
+        "time": f"{start}-{end}",
+        "modality": "In-person" if modality == "Any" else modality,
+    }
+
+
+def term_summaries(by_term: Dict[int, List[str]], credits: Dict[str, int]) -> List[dict]:
+    return [{"term": term_name(t), "credits": sum(credits[c] for c in cs), "courses": cs}
+            for t, cs in sorted(by_term.items())]
+
+
+def solve(
+    courses: List[dict],
+    max_credits: int = DEFAULT_MAX_CREDITS,
+    include_summer: bool = False,
+    start_term: Optional[str] = None,
+    prereq_fn: Callable[[str], list] = find_prerequisites,
+    node_budget: int = DEFAULT_NODE_BUDGET,
+) -> dict:
+    """
+    Build a term-by-term schedule for the 'planned' courses in `courses`.
+
+    `courses` are dicts shaped like main.Course. A course is never placed
+    before its requested `term`, never in the same term as or before one of
+    its planned prerequisites, never over `max_credits` per term, and only in
+    slots its `prefs` allow. Returns a JSON-ready dict with
+    'planned_schedule', 'terms', 'unscheduled', 'warnings' and 'stats'.
+    """
+    started = time.perf_counter()
+    unscheduled: List[dict] = []
+    completed, planned, warnings = split_courses(courses)
+
+    first_term = term_index(start_term) if start_term else None
+    if first_term is None:
+        first_term = current_term_index()
+
+    codes = list(planned)
+    parents: Dict[str, List[str]] = {}
+    release: Dict[str, int] = {}
+    domains: Dict[str, list] = {}
+    for code in codes:
+        c = planned[code]
+        parents[code] = []
+        for p in prereq_fn(code):
+            p = normalize_code(p)
+            if p in planned:
+                parents[code].append(p)
+            elif p not in completed:
+                warnings.append(f"{code} requires {p}, which is neither completed nor planned.")
+        requested = term_index(c.get("term"))
+        release[code] = max(first_term, requested if requested is not None else first_term)
+        domains[code] = meeting_patterns(c.get("prefs"), int(c.get("credits") or 0))
+
+    chain = _chain_lengths(codes, parents)
+    credits = {code: int(planned[code].get("credits") or 0) for code in codes}
+    for code in codes:
+        if credits[code] > max_credits:
+            unscheduled.append({"code": code, "reason": f"{credits[code]} credits exceeds the {max_credits}-credit term limit."})
+
+    blocked = {u["code"] for u in unscheduled}
+    placed_term: Dict[str, int] = {}
+    placed_pat: Dict[str, tuple] = {}
+    pending = [c for c in codes if c not in blocked]
+    nodes = 0
+    term = first_term
+    if term % len(SEASONS) == SEASONS.index("Summer") and not include_summer:
+        term = next_term(term, include_summer)
+
+    while pending:
+        # Constraint propagation: anything downstream of an unschedulable course is unschedulable too
+        changed = True
+        while changed:
+            changed = False
+            for code in pending:
+                bad = [p for p in parents[code] if p in blocked]
+                if bad:
+                    unscheduled.append({"code": code, "reason": f"Prerequisite {bad[0]} could not be scheduled."})
+                    blocked.add(code)
+                    changed = True
+            pending = [c for c in pending if c not in blocked]
+        if not pending:
+            break
+
+        ready = [c for c in pending
+                 if release[c] <= term and all(placed_term.get(p, term) < term for p in parents[c])]
+        if not ready:
+            upcoming = [release[c] for c in pending if all(p in placed_term for p in parents[c])]
+            if not upcoming:
+                # Every pending course waits on another pending one: a prerequisite cycle (or downstream of one)
+                unscheduled.extend({"code": c, "reason": "Prerequisite cycle: it (or a prerequisite) requires itself."}
+                                   for c in pending)
+                break
+            nxt = next_term(term, include_summer)
+            if upcoming and min(upcoming) > nxt:
+                # Jump straight to the first allowed term at or after the next release
+                nxt = min(upcoming)
+                if not include_summer and nxt % len(SEASONS) == SEASONS.index("Summer"):
+                    nxt += 1
+            term = nxt
+            continue
+
+        ready.sort(key=lambda c: (-chain[c], release[c], c))
+        chosen, load = [], 0
+        for c in ready:
+            if load + credits[c] <= max_credits:
+                chosen.append(c)
+                load += credits[c]
+
+        # Drop the lowest-priority course until the term packs; one course alone always fits
+        result = None
+        while chosen:
+            budget = [node_budget]
+            result = _pack([domains[c] for c in chosen], budget)
+            nodes += node_budget - budget[0]
+            if result is not None:
+                break
+            chosen.pop()
+        for c, pat in zip(chosen, result or []):
+            placed_term[c] = term
+            placed_pat[c] = pat
+        pending = [c for c in pending if c not in placed_term]
+        term = next_term(term, include_summer)
+
+    planned_schedule = []
+    by_term: Dict[int, List[str]] = {}
+    for code in sorted(placed_term, key=lambda c: (placed_term[c], c)):
+        planned_schedule.append(schedule_entry(code, planned[code], credits[code], placed_term[code], placed_pat[code]))
+        by_term.setdefault(placed_term[code], []).append(code)
+    terms = term_summaries(by_term, credits)
+
+    return {
+        "planned_schedule": planned_schedule,
+        "terms": terms,
+        "unscheduled": unscheduled,
+        "warnings": warnings,
+        "stats": {
+            "courses": len(codes),
+            "nodes": nodes,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        },
+    }
+
+
+def summarize(result: dict) -> str:
+    """Plain-text reasoning for a solver result, used when the LLM is not requested."""
+    terms = result["terms"]
+    if not terms:
+        text = "No planned courses to schedule."
+    else:
+        text = (f"Scheduled {len(result['planned_schedule'])} course(s) across {len(terms)} term(s), "
+                f"{terms[0]['term']} through {terms[-1]['term']}. Prerequisites are placed in earlier "
+                f"terms, courses with the longest remaining prerequisite chains go first, and meeting "
+                f"times follow each course's day/time-of-day preferences.")
+    if result["unscheduled"]:
+        text += " Could not schedule: " + "; ".join(f"{u['code']} ({u['reason']})" for u in result["unscheduled"])
+    return text
@@ -0,0 +1,229 @@
+# storage.py
+"""
+Course storage backends for the /api/courses routes.
+
+Both backends store courses as plain dicts shaped like main.Course and share
+one interface, so main.py does not care which one is active:
+
+- MemoryCourseStore: the old process-local dict (tests, throwaway demos).
+- SQLiteCourseStore: a SQLite file in WAL mode with indexes on code, term and
+  status. Every uvicorn worker opens the same file, so data survives restarts
+  and is shared across processes.
+
+Listing uses keyset pagination on (code, id): the cursor is the last row
+seen, so page N costs the same as page 1.
+"""
+
+import base64
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+COURSE_FIELDS = ["id", "code", "title", "credits", "term", "status", "grade", "prefs"]
+DEFAULT_DB_PATH = os.path.join(os.getcwd(), "courses.sqlite3")
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    raw = json.dumps([row["code"], row["id"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """(code, id) from a cursor; raises ValueError when it is malformed."""
+    try:
+        code, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return str(code), str(row_id)
+
+
+class MemoryCourseStore:
+    def __init__(self):
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def count(self) -> int:
+        return len(self._rows)
+
+    def get(self, course_id: str) -> Optional[Dict[str, Any]]:
+        return self._rows.get(course_id)
+
+    def list(self, limit: Optional[int] = None, after: Optional[str] = None,
+             code: Optional[str] = None, term: Optional[str] = None,
+             status: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        rows = [r for r in self._rows.values()
+                if (code is None or r["code"] == code)
+                and (term is None or r["term"] == term)
+                and (status is None or r["status"] == status)]
+        rows.sort(key=lambda r: (r["code"], r["id"]))
+        if after is not None:
+            key = decode_cursor(after)
+            rows = [r for r in rows if (r["code"], r["id"]) > key]
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            return rows, encode_cursor(rows[-1])
+        return rows, None
+
+    def put(self, row: Dict[str, Any]):
+        with self._lock:
+            self._rows[row["id"]] = row
+
+    def delete(self, course_id: str) -> bool:
+        with self._lock:
+            return self._rows.pop(course_id, None) is not None
+
+    def bulk(self, create: List[Dict[str, Any]], update: List[Tuple[str, Dict[str, Any]]],
+             delete: List[str], validate: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+             ) -> Dict[str, Any]:
+        """
+        All-or-nothing batch. Raises KeyError (and changes nothing) if an id is
+        unknown; whatever validate() raises for a merged row aborts it the same way.
+        A repeated delete id is deleted once.
+        """
+        delete = list(dict.fromkeys(delete))
+        created = {row["id"] for row in create}
+        with self._lock:
+            # Every id is checked before anything changes; creates land before deletes
+            missing = ([i for i, _ in update if i not in self._rows]
+                       + [i for i in delete if i not in self._rows and i not in created])
+            if missing:
+                raise KeyError(missing[0])
+            updated = []
+            for course_id, patch in update:
+                row = {**self._rows[course_id], **patch}
+                updated.append(validate(row) if validate else row)
+            for row in updated:
+                self._rows[row["id"]] = row
+            for row in create:
+                self._rows[row["id"]] = row
+            for course_id in delete:
+                del self._rows[course_id]
+        return {"created": create, "updated": updated, "deleted": delete}
+
+
+class SQLiteCourseStore:
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS courses ("
+                "id TEXT PRIMARY KEY, code TEXT NOT NULL, title TEXT NOT NULL, "
+                "credits INTEGER NOT NULL, term TEXT NOT NULL, status TEXT NOT NULL, "
+                "grade TEXT, prefs TEXT NOT NULL)"
+            )
+            # (code, id) doubles as the keyset pagination order
+            db.execute("CREATE INDEX IF NOT EXISTS idx_courses_code ON courses (code, id)")
+            db.execute("CREATE INDEX IF NOT EXISTS idx_courses_term ON courses (term, code, id)")
+            db.execute("CREATE INDEX IF NOT EXISTS idx_courses_status ON courses (status, code, id)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread: FastAPI runs sync routes on a threadpool
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def _to_row(values) -> Dict[str, Any]:
+        row = dict(zip(COURSE_FIELDS, values))
+        row["prefs"] = json.loads(row["prefs"])
+        return row
+
+    @staticmethod
+    def _to_values(row: Dict[str, Any]) -> tuple:
+        return tuple(json.dumps(row.get(f)) if f == "prefs" else row.get(f) for f in COURSE_FIELDS)
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM courses").fetchone()[0]
+
+    def get(self, course_id: str) -> Optional[Dict[str, Any]]:
+        values = self._conn().execute(
+            f"SELECT {', '.join(COURSE_FIELDS)} FROM courses WHERE id = ?", (course_id,)
+        ).fetchone()
+        return self._to_row(values) if values else None
+
+    def list(self, limit: Optional[int] = None, after: Optional[str] = None,
+             code: Optional[str] = None, term: Optional[str] = None,
+             status: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        where, params = [], []
+        for column, value in (("code", code), ("term", term), ("status", status)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if after is not None:
+            where.append("(code, id) > (?, ?)")
+            params.extend(decode_cursor(after))
+        sql = f"SELECT {', '.join(COURSE_FIELDS)} FROM courses"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY code, id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit + 1)  # one extra row tells us whether another page exists
+        rows = [self._to_row(v) for v in self._conn().execute(sql, params)]
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            return rows, encode_cursor(rows[-1])
+        return rows, None
+
+    def put(self, row: Dict[str, Any]):
+        with self._conn() as db:
+            db.execute(
+                f"INSERT OR REPLACE INTO courses ({', '.join(COURSE_FIELDS)}) "
+                f"VALUES ({', '.join('?' * len(COURSE_FIELDS))})",
+                self._to_values(row),
+            )
+
+    def delete(self, course_id: str) -> bool:
+        with self._conn() as db:
+            return db.execute("DELETE FROM courses WHERE id = ?", (course_id,)).rowcount > 0
+
+    def bulk(self, create: List[Dict[str, Any]], update: List[Tuple[str, Dict[str, Any]]],
+             delete: List[str], validate: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+             ) -> Dict[str, Any]:
+        """
+        All-or-nothing batch in one transaction. Raises KeyError (and rolls back)
+        if an id is unknown; whatever validate() raises for a merged row rolls back too.
+        A repeated delete id is deleted once.
+        """
+        delete = list(dict.fromkeys(delete))
+        db = self._conn()
+        placeholders = ", ".join("?" * len(COURSE_FIELDS))
+        # Take the write lock before the first SELECT so the rows read are the rows written over
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            updated = []
+            for course_id, patch in update:
+                values = db.execute(
+                    f"SELECT {', '.join(COURSE_FIELDS)} FROM courses WHERE id = ?", (course_id,)
+                ).fetchone()
+                if values is None:
+                    raise KeyError(course_id)
+                row = {**self._to_row(values), **patch}
+                updated.append(validate(row) if validate else row)
+            db.executemany(
+                f"INSERT OR REPLACE INTO courses ({', '.join(COURSE_FIELDS)}) VALUES ({placeholders})",
+                [self._to_values(r) for r in create + updated],
+            )
+            for course_id in delete:
+                if db.execute("DELETE FROM courses WHERE id = ?", (course_id,)).rowcount == 0:
+                    raise KeyError(course_id)
+        except BaseException:
+            db.rollback()
+            raise
+        db.commit()
+        return {"created": create, "updated": updated, "deleted": delete}
+
+
+def open_course_store():
+    """Backend picked by COURSE_STORE ("sqlite", the default, or "memory")."""
+    backend = os.getenv("COURSE_STORE", "sqlite").lower()
+    if backend == "memory":
+        return MemoryCourseStore()
+    return SQLiteCourseStore(os.getenv("COURSE_DB_PATH", DEFAULT_DB_PATH))
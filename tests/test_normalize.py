@@ -0,0 +1,16 @@
+# tests/test_normalize.py
+import normalize
+
+
+def codes(text: str) -> list:
+    return [c["code"] for c in normalize.normalize_text(text)["courses_taken"] or []]
+
+
+def test_numbers_in_sentences_are_not_courses():
+    text = ("I work 2000 hours a year and have 1200 saved. I need 3000 more, "
+            "which is over 2000 dollars. I started in 2023 and graduate by May 2027.")
+    assert codes(text) == []
+
+
+def test_course_codes_still_found_in_sentences():
+    assert codes("I took COSC 1336 and MATH2413 in 2024, and I work 20 hours.") == ["COSC 1336", "MATH 2413"]
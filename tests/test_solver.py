@@ -0,0 +1,15 @@
+# tests/test_solver.py
+import solver
+
+
+def course(code: str) -> dict:
+    return {"code": code, "title": code, "credits": 3, "term": "Fall 2026"}
+
+
+def test_prerequisite_cycle_is_unscheduled_not_hung():
+    prereqs = {"COSC 1336": ["COSC 3320"], "COSC 3320": ["COSC 1336"], "COSC 4351": ["COSC 3320"]}
+    result = solver.solve([course("COSC 1336"), course("COSC 3320"), course("COSC 4351"), course("MATH 2413")],
+                          start_term="Fall 2026", prereq_fn=lambda c: prereqs.get(c, []))
+    assert [e["code"] for e in result["planned_schedule"]] == ["MATH 2413"]
+    assert sorted(u["code"] for u in result["unscheduled"]) == ["COSC 1336", "COSC 3320", "COSC 4351"]
+    assert all("cycle" in u["reason"] for u in result["unscheduled"])
@@ -0,0 +1,50 @@
+# tests/test_validation.py
+import math
+
+import validation
+
+MAJOR = "Computer Science"
+
+
+def plan_entries(major: str = MAJOR) -> list:
+    return [entry for term in validation.generate_plan_from_major(major) for entry in term["courses"]]
+
+
+def plan_codes(major: str = MAJOR) -> list:
+    return [f"{dept} {num}" for entry in plan_entries(major)
+            for dept, num in validation.COURSE_CODE_RE.findall(entry)]
+
+
+def generic_slots(major: str = MAJOR) -> int:
+    return sum(1 for entry in plan_entries(major) if not validation.COURSE_CODE_RE.search(entry))
+
+
+def test_minimum_terms_new_student_counts_every_entry():
+    expected = math.ceil(len(plan_entries()) / validation.MAX_COURSES_PER_TERM)
+    assert validation.minimum_terms([], MAJOR) == expected == 8
+
+
+def test_minimum_terms_generic_slots_remain_after_coded_courses():
+    assert validation.minimum_terms(plan_codes(), MAJOR) == math.ceil(
+        generic_slots() / validation.MAX_COURSES_PER_TERM)
+
+
+def test_minimum_terms_off_plan_courses_fill_generic_slots():
+    extra = [f"HIST {1000 + i}" for i in range(generic_slots() + 3)]  # more than there are slots
+    assert validation.minimum_terms(plan_codes() + extra[:5], MAJOR) == math.ceil(
+        (generic_slots() - 5) / validation.MAX_COURSES_PER_TERM)
+    assert validation.minimum_terms(plan_codes() + extra, MAJOR) == 0
+
+
+def test_minimum_terms_chain_bound_wins():
+    chain = validation.eligible_courses([], MAJOR)["remaining_chain"]
+    extra = [f"HIST {1000 + i}" for i in range(generic_slots())]
+    completed = [c for c in plan_codes() if c not in chain] + extra
+    assert math.ceil(len(chain) / validation.MAX_COURSES_PER_TERM) < len(chain)
+    assert validation.minimum_terms(completed, MAJOR) == len(chain)
+
+
+def test_is_unlocked():
+    assert validation.is_unlocked("COSC 1336", [])
+    assert not validation.is_unlocked("COSC 2436", ["COSC 1336"])
+    assert validation.is_unlocked("COSC 2436", validation.all_prerequisites("COSC 2436"))
@@ -1,83 +1,280 @@
 # validation.py
-from datetime import date, timedelta
-
-# UH Computer Science Degree Plan (2023–2024)
-UH_COSC_PLAN = {
-    1: {
-        "Fall": ["COSC 1336", "MATH 2413", "ENGL 1301", "CORE US History", "CORE Language/Philosophy/Culture"],
-        "Spring": ["COSC 1437", "MATH 2414", "ENGL 1302", "CORE US History", "CORE Elective"],
-    },
-    2: {
-        "Fall": ["COSC 2425", "MATH 2305", "GOVT 2305", "Creative Arts", "NSM Science Lecture"],
-        "Spring": ["COSC 2436", "GOVT 2306", "MATH 2318/3321", "NSM Science Lecture", "Social & Behavioral Science"],
-    },
-    3: {
-        "Fall": ["COSC 3320", "COSC 3340", "MATH 3339", "CORE Writing in the Disciplines", "NSM Science Lecture+Lab"],
-        "Spring": ["COSC 3360", "COSC 3380", "Capstone/Free Elective", "NSM Science Lecture+Lab"],
-    },
-    4: {
-        "Fall": ["COSC XXXX (Advanced Elective)", "COSC XXXX (Advanced Elective)", "COSC 4351/4353 (Software Eng/Design)", "Capstone/Free Elective"],
-        "Spring": ["COSC XXXX (Advanced Elective)", "COSC XXXX (Advanced Elective)", "Capstone/Free Elective"],
-    },
-}
+import math
+import os
+from datetime import date
+from functools import lru_cache
+
+import catalog
+from catalog import COURSE_CODE_RE, normalize_code
+
+# Degree plans and prerequisite tables for every major live in catalogs/*.json,
+# compiled to a shared memory-mapped file (see catalog.py). Prerequisites are
+# read from it per course on demand, not copied into every process up front.
+CATALOG = catalog.load_catalog()
+
+DEFAULT_MAJOR = "Computer Science"
+PLAN_CACHE_SIZE = int(os.getenv("PLAN_CACHE_SIZE", 256))  # (major, start_year) plans kept in memory
+PREREQ_CACHE_SIZE = int(os.getenv("PREREQ_CACHE_SIZE", 4096))  # courses whose prerequisites are kept decoded
+
+MAX_COURSES_PER_TERM = 5
+
+
+class PrereqGraph:
+    """
+    Prerequisite DAG compiled once from a {course: [direct prereqs]} table.
+
+    Every course code gets an integer id, and each course keeps two bitset rows
+    (Python ints): its direct prerequisites and the transitive closure of them.
+    A set of courses is also a bitset, so "is X unlocked by S" is a single
+    `closure[x] & ~S` test.
+    """
+
+    def __init__(self, table: dict):
+        codes = sorted(set(table) | {p for ps in table.values() for p in ps})
+        self.codes = codes
+        self.ids = {code: i for i, code in enumerate(codes)}
+        self.direct = [0] * len(codes)
+        for code, prereqs in table.items():
+            for p in prereqs:
+                self.direct[self.ids[code]] |= 1 << self.ids[p]
+
+        # Topological order (parents first), then closure rows in one pass
+        self.order = []
+        indegree = [bin(row).count("1") for row in self.direct]
+        children = [[] for _ in codes]
+        for i, row in enumerate(self.direct):
+            for p in self._ids(row):
+                children[p].append(i)
+        queue = [i for i, d in enumerate(indegree) if d == 0]
+        while queue:
+            i = queue.pop()
+            self.order.append(i)
+            for k in children[i]:
+                indegree[k] -= 1
+                if indegree[k] == 0:
+                    queue.append(k)
+        if len(self.order) != len(codes):
+            raise ValueError("Prerequisite table contains a cycle.")
+
+        self.closure = [0] * len(codes)
+        for i in self.order:
+            row = self.direct[i]
+            for p in self._ids(self.direct[i]):
+                row |= self.closure[p]
+            self.closure[i] = row
+
+    @staticmethod
+    def _ids(mask: int):
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    def mask(self, codes) -> int:
+        """Bitset for a collection of course codes; codes outside the graph are ignored."""
+        m = 0
+        for code in codes:
+            i = self.ids.get(code)
+            if i is not None:
+                m |= 1 << i
+        return m
+
+    def prerequisites(self, code: str, transitive: bool = False) -> list:
+        i = self.ids.get(code)
+        if i is None:
+            return []
+        row = self.closure[i] if transitive else self.direct[i]
+        return [self.codes[p] for p in self._ids(row)]
+
+    def is_unlocked(self, code: str, completed_mask: int) -> bool:
+        """True when every (transitive) prerequisite of `code` is in `completed_mask`."""
+        i = self.ids.get(code)
+        return i is None or not self.closure[i] & ~completed_mask
+
+    def unlock_report(self, completed) -> dict:
+        """
+        Batch query for a student's completed courses: every course that is now
+        eligible, and the longest chain of prerequisites still to be taken.
+        """
+        done = self.mask(completed)
+        eligible = [self.codes[i] for i in range(len(self.codes))
+                    if not done >> i & 1 and not self.closure[i] & ~done]
+
+        # Longest path over the courses not yet completed (DP in topological order)
+        length = [0] * len(self.codes)
+        back = [-1] * len(self.codes)
+        for i in self.order:
+            if done >> i & 1:
+                continue
+            best = -1
+            for p in self._ids(self.direct[i] & ~done):
+                if best < 0 or length[p] > length[best]:
+                    best = p
+            length[i] = 1 + (length[best] if best >= 0 else 0)
+            back[i] = best
+        chain = []
+        if any(length):
+            i = max(range(len(length)), key=lambda k: (length[k], -k))
+            while i >= 0:
+                chain.append(self.codes[i])
+                i = back[i]
+            chain.reverse()
+        return {"eligible": eligible, "remaining_chain": chain}
+
+
+@lru_cache(maxsize=PREREQ_CACHE_SIZE)
+def _direct(course_name: str) -> tuple:
+    return tuple(CATALOG.prerequisites(course_name))
+
+
+@lru_cache(maxsize=PREREQ_CACHE_SIZE)
+def _closure(course_name: str) -> frozenset:
+    seen, stack = set(), list(_direct(course_name))
+    while stack:
+        p = stack.pop()
+        if p not in seen:
+            seen.add(p)
+            stack.extend(_direct(p))
+    return frozenset(seen)
 
 
 def find_prerequisites(course_name: str) -> list:
     """
-    Return simplified prerequisites for key UH COSC courses.
-    (Based on typical dependencies — can be expanded.)
+    Return the direct prerequisites of a course (merged across the catalog's majors).
     """
-    prereqs = {
-        "COSC 1437": ["COSC 1336"],
-        "COSC 2425": ["COSC 1437"],
-        "COSC 2436": ["COSC 2425"],
-        "COSC 3320": ["COSC 2436"],
-        "COSC 3340": ["COSC 2436", "MATH 2305"],
-        "COSC 3360": ["COSC 2436"],
-        "COSC 4351": ["COSC 3320", "COSC 3360"],
-        "COSC 4353": ["COSC 3320", "COSC 3360"],
-    }
-    return prereqs.get(course_name, [])
+    return list(_direct(course_name))
+
+
+def all_prerequisites(course_name: str) -> list:
+    """Every prerequisite of a course, direct or transitive."""
+    return sorted(_closure(course_name))
+
+
+def is_unlocked(course_name: str, completed: list) -> bool:
+    graph = catalog_graph()
+    return graph.is_unlocked(course_name, graph.mask(completed))
+
+
+@lru_cache(maxsize=1)
+def catalog_graph() -> PrereqGraph:
+    """Prerequisite graph of the whole catalog, built on first use."""
+    return PrereqGraph(CATALOG.prerequisite_table())
+
+
+def eligible_courses(completed: list, major: str = None) -> dict:
+    """
+    Eligible courses and the longest remaining prerequisite chain for a completed
+    list, over the whole catalog or (with `major`) that major's plan.
+    """
+    graph = major_graph(major_row(major)) if major else catalog_graph()
+    return graph.unlock_report(completed)
 
 
-def generate_plan_from_major(major: str = "Computer Science") -> list:
+def completed_codes(courses_taken) -> list:
+    """Course codes from normalized 'courses_taken' (a list of codes/dicts, or raw text)."""
+    if not courses_taken:
+        return []
+    if isinstance(courses_taken, str):
+        return [f"{dept} {num}" for dept, num in COURSE_CODE_RE.findall(courses_taken.upper())]
+    codes = []
+    for item in courses_taken:
+        code = item.get("code") if isinstance(item, dict) else item
+        if code:
+            codes.append(normalize_code(str(code)))
+    return codes
+
+
+def major_row(major) -> int:
+    """Catalog row for a major name or alias; unknown majors fall back to DEFAULT_MAJOR."""
+    row = CATALOG.find_major(major) if major else None
+    return row if row is not None else CATALOG.find_major(DEFAULT_MAJOR)
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _cached_plan(row: int, start_year: int) -> tuple:
+    return tuple(
+        (year, f"{season} {start_year + year - 1}", tuple(courses))
+        for year, season, courses in CATALOG.plan(row)
+    )
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def major_graph(row: int) -> PrereqGraph:
+    """Prerequisite graph of a major's plan courses and everything they require."""
+    keep = set()
+    for _, _, courses in CATALOG.plan(row):
+        # Plan entries can be "COSC 4351/4353 (Software Eng/Design)"; take the codes in them
+        for dept, num in COURSE_CODE_RE.findall(" | ".join(courses)):
+            code = f"{dept} {num}"
+            if _direct(code) or CATALOG.is_prerequisite(code):
+                keep |= {code} | _closure(code)
+    return PrereqGraph({code: find_prerequisites(code) for code in keep})
+
+
+def generate_plan_from_major(major: str = DEFAULT_MAJOR, start_year: int = None) -> list:
     """
-    Generate a realistic 4-year course plan for UH Computer Science students.
+    Generate a realistic 4-year course plan for a major in the catalog.
+    Plans are memoized per (major, start_year) in a bounded LRU.
     """
-    plan = []
-    start_year = date.today().year
+    plan = _cached_plan(major_row(major), start_year or date.today().year)
+    return [{"year": year, "term": term, "courses": list(courses)} for year, term, courses in plan]
+
 
-    for year, semesters in UH_COSC_PLAN.items():
-        for term_name, courses in semesters.items():
-            term = f"{term_name} {start_year + year - 1}"
-            plan.append({
-                "year": year,
-                "term": term,
-                "courses": courses
-            })
-    return plan
+def minimum_terms(completed: list, major: str = DEFAULT_MAJOR) -> int:
+    """
+    Fewest Fall/Spring terms to finish the degree plan: at least the longest
+    remaining prerequisite chain (one course per term along it), and at least
+    the remaining plan entries spread at MAX_COURSES_PER_TERM. A coded entry
+    is done when its course (or one of its alternatives, "MATH 2318/3321")
+    is. Generic slots ("CORE US History", "COSC XXXX (Advanced Elective)")
+    name no course, so each completed course outside the plan fills at most one.
+    """
+    done = set(completed)
+    plan = _cached_plan(major_row(major), date.today().year)
+    remaining, generic, plan_codes = 0, 0, set()
+    for _, _, courses in plan:
+        for entry in courses:
+            codes = [f"{dept} {num}" for dept, num in COURSE_CODE_RE.findall(entry)]
+            plan_codes.update(codes)
+            if not codes:
+                generic += 1
+            elif done.isdisjoint(codes):
+                remaining += 1
+    remaining += max(generic - len(done - plan_codes), 0)
+    chain = eligible_courses(completed, major)["remaining_chain"]
+    return max(len(chain), math.ceil(remaining / MAX_COURSES_PER_TERM))
 
 
 def estimate_graduation_date(terms_needed: int = 8) -> str:
     """
-    Each term = ~4 months, 8 terms = ~32 months (≈4 years).
+    Graduation at the end of the last of `terms_needed` Fall/Spring terms,
+    counting from the upcoming term (May for Spring, December for Fall).
     """
-    months_to_grad = terms_needed * 4
-    grad_date = date.today() + timedelta(days=months_to_grad * 30)
-    return grad_date.strftime("%B %Y")
+    today = date.today()
+    # Upcoming term as a half-year index: year * 2 + (0 = Spring, 1 = Fall)
+    start = today.year * 2 + (0 if today.month < 6 else 1)
+    year, half = divmod(start + max(terms_needed, 1) - 1, 2)
+    return f"{'December' if half else 'May'} {year}"
 
 
 def build_plan(normalized_data: dict) -> dict:
     """
     High-level function that builds a course plan and predicts graduation date
-    for UH Computer Science students.
+    for a student of any major in the catalog.
     """
-    major = normalized_data.get("major", "Computer Science")
+    major = normalized_data.get("major") or DEFAULT_MAJOR
     plan = generate_plan_from_major(major)
-    graduation = estimate_graduation_date()
+    completed = completed_codes(normalized_data.get("courses_taken"))
+    report = eligible_courses(completed, major)
+    terms_needed = minimum_terms(completed, major)
+    graduation = estimate_graduation_date(terms_needed)
 
     return {
         "student_info": normalized_data,
+        "major": CATALOG.major_name(major_row(major)),
         "degree_plan": plan,
+        "eligible_courses": report["eligible"],
+        "critical_path": report["remaining_chain"],
+        "terms_needed": terms_needed,
         "estimated_graduation": graduation
     }
@@ -0,0 +1,42 @@
+# workers.py
+"""
+Shared process pool for CPU-bound work (PDF extraction, batch normalization).
+
+One pool per API process, sized to the cores and created on first use. The
+spawn start method is used because forking a process that already runs an
+event loop and threads is unsafe.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def pool_size() -> int:
+    return int(os.getenv("WORKER_PROCESSES", os.cpu_count() or 1))
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=pool_size(),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def discard_pool(pool: ProcessPoolExecutor):
+    """Drop a pool that broke (a worker died) so the next get_pool() starts fresh."""
+    if _pool is pool:
+        shutdown_pool()